@@ -1,9 +1,12 @@
-# backend/models/book.py
-from http.client import SWITCHING_PROTOCOLS
-from sqlalchemy import Column, Integer, String, Boolean, Date
+# backend/models/base.py
 from sqlalchemy.ext.declarative import declarative_base
 
+# Shared by all models so relationships and foreign keys resolve
 Base = declarative_base()
+# backend/models/book.py
+from http.client import SWITCHING_PROTOCOLS
+from sqlalchemy import Column, Integer, String, Boolean, Date
+from .base import Base
 
 class Book(Base):
     __tablename__ = 'books'
@@ -17,31 +20,624 @@ class Book(Base):
     status = Column(String(20))  # Available, Issued, Lost
     acquisition_date = Column(Date)
 # backend/services/barcode_service.py
-import barcode
-from barcode.writer import ImageWriter
-from PIL import Image
-from pyzbar.pyzbar import decode
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# python-barcode, Pillow and pyzbar are imported on first use to keep
+# application startup fast
+
+# A4 page in pixels at 300 DPI
+A4_PAGE_SIZE = (2480, 3508)
+LABEL_SHEET_DPI = 300
+
+def _render_to_cache(job):
+    """Render one code into the label cache; runs in a worker process"""
+    code, symbology, fmt, path = job
+    data = BarcodeService.render_barcode(code, symbology, fmt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary name first so a half-written file is never cached
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    return code, path
 
 class BarcodeService:
     @staticmethod
     def generate_barcode(isbn):
+        import barcode
+        from barcode.writer import ImageWriter
+
         EAN = barcode.get_barcode_class('ean13')
         ean = EAN(isbn, writer=ImageWriter())
         filename = f"barcodes/{isbn}"
         ean.save(filename)
         return filename
 
+    @staticmethod
+    def render_barcode(code, symbology='ean13', fmt='png'):
+        """Render a barcode in memory. Returns: PNG or SVG bytes"""
+        import barcode
+        from barcode.writer import ImageWriter, SVGWriter
+
+        writer = ImageWriter() if fmt == 'png' else SVGWriter()
+        buffer = io.BytesIO()
+        barcode.get(symbology, code, writer=writer).write(buffer)
+        return buffer.getvalue()
+
+    @staticmethod
+    def label_path(code, symbology='ean13', fmt='png', cache_dir='barcodes/labels'):
+        """Cache location of a label, addressed by a hash of what it renders"""
+        key = hashlib.sha1(f"{symbology}:{fmt}:{code}".encode('utf-8')).hexdigest()
+        return os.path.join(cache_dir, key[:2], f"{key}.{fmt}")
+
+    @staticmethod
+    def generate_batch(codes, symbology='ean13', fmt='png',
+                       cache_dir='barcodes/labels', workers=None):
+        """Render many labels in a process pool, reusing cached ones.
+
+        Use symbology='ean13' for book ISBNs and 'code128' for student ids.
+        Returns: dict with 'paths' (code -> file), 'rendered' and 'cached'
+        counts, 'elapsed' seconds and 'labels_per_second'
+        """
+        started = time.monotonic()
+        paths = {}
+        jobs = []
+        for code in dict.fromkeys(codes):
+            path = BarcodeService.label_path(code, symbology, fmt, cache_dir)
+            if os.path.exists(path):
+                paths[code] = path
+            else:
+                jobs.append((code, symbology, fmt, path))
+        cached = len(paths)
+
+        if jobs:
+            workers = workers or os.cpu_count() or 1
+            chunksize = max(1, len(jobs) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for code, path in executor.map(_render_to_cache, jobs,
+                                               chunksize=chunksize):
+                    paths[code] = path
+
+        elapsed = time.monotonic() - started
+        return {
+            'paths': paths,
+            'rendered': len(jobs),
+            'cached': cached,
+            'elapsed': elapsed,
+            'labels_per_second': len(paths) / elapsed if elapsed else 0.0
+        }
+
+    @staticmethod
+    def compose_label_sheets(image_paths, output_path, columns=3, rows=8,
+                             margin=60):
+        """Lay PNG labels out on printable A4 pages and save them as one PDF.
+        Returns: number of pages written
+        """
+        from PIL import Image
+
+        page_width, page_height = A4_PAGE_SIZE
+        cell_width = (page_width - 2 * margin) // columns
+        cell_height = (page_height - 2 * margin) // rows
+        per_page = columns * rows
+
+        pages = []
+        for start in range(0, len(image_paths), per_page):
+            page = Image.new('RGB', A4_PAGE_SIZE, 'white')
+            for slot, path in enumerate(image_paths[start:start + per_page]):
+                with Image.open(path) as label:
+                    label = label.convert('RGB')
+                    label.thumbnail((cell_width - 20, cell_height - 20))
+                    column, row = slot % columns, slot // columns
+                    x = margin + column * cell_width + (cell_width - label.width) // 2
+                    y = margin + row * cell_height + (cell_height - label.height) // 2
+                    page.paste(label, (x, y))
+            pages.append(page)
+
+        if pages:
+            pages[0].save(output_path, save_all=True, append_images=pages[1:],
+                          resolution=LABEL_SHEET_DPI)
+        return len(pages)
+
     @staticmethod
     def scan_barcode(image_path):
+        from PIL import Image
+        from pyzbar.pyzbar import decode
+
         image = Image.open(image_path)
         decoded_objects = decode(image)
         for obj in decoded_objects:
             return obj.data.decode('utf-8')
         return None
+# backend/services/scan_pipeline.py
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff')
+
+def preprocess_frame(frame, max_width=640):
+    """Convert a frame (PIL image or numpy array) to a downscaled grayscale image"""
+    from PIL import Image
+
+    if not isinstance(frame, Image.Image):
+        frame = Image.fromarray(frame)
+    image = frame.convert('L')
+    if image.width > max_width:
+        height = round(image.height * max_width / image.width)
+        image = image.resize((max_width, height))
+    return image
+
+def frames_from_directory(path):
+    """Yield sample frames from the image files in a directory, in name order"""
+    from PIL import Image
+
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with Image.open(os.path.join(path, name)) as image:
+                image.load()
+                yield image
+
+def frames_from_video(source=0):
+    """Yield grayscale frames from a video file or camera index (needs OpenCV)"""
+    import cv2
+
+    capture = cv2.VideoCapture(source)
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    finally:
+        capture.release()
+
+class ScanPipeline:
+    """Decodes barcodes from a stream of frames on a background worker thread.
+
+    Only the newest frame is kept: if decoding falls behind the camera, the
+    older frame is dropped. The central region of interest is decoded first
+    and the full frame only when that finds nothing. The same code read
+    again within duplicate_window seconds is ignored.
+    """
+
+    def __init__(self, on_code, max_width=640, roi=(0.15, 0.25, 0.85, 0.75),
+                 duplicate_window=2.0):
+        self.on_code = on_code
+        self.max_width = max_width
+        self.roi = roi
+        self.duplicate_window = duplicate_window
+        self._frames = queue.Queue(maxsize=1)
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_code = None
+        self._last_code_at = 0.0
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+        self.codes_decoded = 0
+        self.latencies = deque(maxlen=1000)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='scan-pipeline',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, frame):
+        """Queue a frame for decoding, replacing any frame not yet decoded"""
+        self.frames_submitted += 1
+        item = (frame, time.monotonic())
+        try:
+            self._frames.put_nowait(item)
+        except queue.Full:
+            try:
+                self._frames.get_nowait()
+                self.frames_dropped += 1
+            except queue.Empty:
+                pass
+            self._frames.put_nowait(item)
+
+    def feed(self, frames, fps=None):
+        """Submit frames from an iterable, optionally paced like a camera"""
+        try:
+            for frame in frames:
+                if self._stop.is_set():
+                    break
+                self.submit(frame)
+                if fps:
+                    time.sleep(1.0 / fps)
+        finally:
+            # Releases the camera when frames is a generator
+            close = getattr(frames, 'close', None)
+            if close is not None:
+                close()
+
+    def wait_until_idle(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not self._frames.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                frame, submitted_at = self._frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            code = self.decode_frame(frame)
+            if code is not None:
+                self._emit(code, submitted_at)
+
+    def decode_frame(self, frame):
+        from pyzbar.pyzbar import decode
+
+        image = preprocess_frame(frame, self.max_width)
+        if self.roi:
+            left, top, right, bottom = self.roi
+            region = image.crop((
+                int(image.width * left), int(image.height * top),
+                int(image.width * right), int(image.height * bottom)
+            ))
+            decoded_objects = decode(region)
+            if decoded_objects:
+                return decoded_objects[0].data.decode('utf-8')
+        decoded_objects = decode(image)
+        if decoded_objects:
+            return decoded_objects[0].data.decode('utf-8')
+        return None
+
+    def _emit(self, code, submitted_at):
+        now = time.monotonic()
+        if code == self._last_code and now - self._last_code_at < self.duplicate_window:
+            self._last_code_at = now
+            return
+        self._last_code = code
+        self._last_code_at = now
+        self.codes_decoded += 1
+        self.latencies.append(now - submitted_at)
+        self.on_code(code)
+
+    def stats(self):
+        """Returns: frame counts and decode latency (ms) of recent reads"""
+        latencies = sorted(self.latencies)
+        return {
+            'frames_submitted': self.frames_submitted,
+            'frames_dropped': self.frames_dropped,
+            'codes_decoded': self.codes_decoded,
+            'avg_latency_ms': 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            'p95_latency_ms': 1000 * latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+        }
+# frontend/widgets/scanner_bridge.py
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal
+from backend.services.scan_pipeline import ScanPipeline, frames_from_video
+
+class ScannerBridge(QObject):
+    """Runs a ScanPipeline on a camera and delivers decoded codes as Qt signals"""
+    code_scanned = pyqtSignal(str)
+    # The camera could not be opened or read (e.g. OpenCV is not installed)
+    scan_failed = pyqtSignal(str)
+
+    def __init__(self, source=0, parent=None):
+        super().__init__(parent)
+        self.source = source
+        # Signals emitted from the worker thread are queued to the GUI thread
+        self.pipeline = ScanPipeline(self.code_scanned.emit)
+        self._capture_thread = None
+        self._stopping = False
+
+    def start(self):
+        if self._capture_thread is not None:
+            return
+        self._stopping = False
+        self.pipeline.start()
+        self._capture_thread = threading.Thread(
+            target=self._capture,
+            name='scan-capture',
+            daemon=True
+        )
+        self._capture_thread.start()
+
+    def _capture(self):
+        try:
+            self.pipeline.feed(frames_from_video(self.source))
+        except Exception as e:
+            self.pipeline.stop()
+            self.scan_failed.emit(str(e))
+            return
+        if not self._stopping:
+            self.pipeline.stop()
+            self.scan_failed.emit("The camera stopped delivering frames")
+
+    def stop(self):
+        self._stopping = True
+        self.pipeline.stop()
+        if self._capture_thread is not None:
+            self._capture_thread.join()
+            self._capture_thread = None
+# backend/services/pagination.py
+from sqlalchemy import and_, or_
+
+def keyset_page(query, sort_expression, id_column, after=None, limit=200,
+                descending=False):
+    """Fetch one page of a query ordered by (sort_expression, id).
+
+    after is the (sort value, id) key of the last row of the previous page,
+    so each page is an index range scan instead of an OFFSET.
+    Returns: list of (key, row) pairs
+    """
+    query = query.add_columns(sort_expression.label('sort_key'))
+    if after is not None:
+        sort_value, last_id = after
+        if descending:
+            query = query.filter(or_(
+                sort_expression < sort_value,
+                and_(sort_expression == sort_value, id_column < last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_expression > sort_value,
+                and_(sort_expression == sort_value, id_column > last_id)
+            ))
+    if descending:
+        query = query.order_by(sort_expression.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_expression, id_column)
+
+    return [((row.sort_key, row.id), row) for row in query.limit(limit)]
+# backend/services/book_service.py
+from datetime import date
+from sqlalchemy import func, or_
+from ..models.book import Book
+from .pagination import keyset_page
+from ..instrumentation import instrument_methods
+
+# Sortable columns of the book table, in display order
+BOOK_SORT_COLUMNS = [
+    func.coalesce(Book.isbn, ''),
+    Book.title,
+    func.coalesce(Book.author, ''),
+    func.coalesce(Book.status, ''),
+    func.coalesce(Book.is_donated, False),
+    # Books without an acquisition date sort first
+    func.coalesce(Book.acquisition_date, date.min),
+]
+
+@instrument_methods
+class BookService:
+    def __init__(self, db_session):
+        self.session = db_session
+
+    def fetch_page(self, after=None, limit=200, sort_column=1, descending=False,
+                   filter_text=None):
+        """One keyset page of the catalog for the book table.
+        Returns: list of (key, (isbn, title, author, status, donated, acquired))
+        """
+        sort_expression = (BOOK_SORT_COLUMNS[sort_column] if sort_column is not None
+                           else Book.title)
+
+        query = self.session.query(
+            Book.id, Book.isbn, Book.title, Book.author, Book.status,
+            Book.is_donated, Book.acquisition_date
+        )
+        if filter_text:
+            pattern = f"%{filter_text}%"
+            query = query.filter(or_(
+                Book.title.ilike(pattern),
+                Book.author.ilike(pattern),
+                Book.isbn.ilike(pattern),
+                Book.barcode.ilike(pattern)
+            ))
+
+        return [(key, (
+            row.isbn or '',
+            row.title,
+            row.author or '',
+            row.status or '',
+            "Yes" if row.is_donated else "No",
+            str(row.acquisition_date or '')
+        )) for key, row in keyset_page(query, sort_expression, Book.id, after,
+                                        limit, descending)]
+# backend/services/search_service.py
+import difflib
+import re
+from sqlalchemy import and_, or_, text
+from ..models.book import Book
+from ..instrumentation import instrument_methods
+
+# SQLite FTS5 index over the catalog, kept in sync with books by triggers
+FTS_SETUP = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        title, author, isbn, barcode,
+        content='books', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS books_fts_vocab
+        USING fts5vocab(books_fts, 'row')""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, author, isbn, barcode)
+        VALUES (new.id, new.title, new.author, new.isbn, new.barcode);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, isbn, barcode)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn, old.barcode);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_au
+        AFTER UPDATE OF title, author, isbn, barcode ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, isbn, barcode)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn, old.barcode);
+        INSERT INTO books_fts(rowid, title, author, isbn, barcode)
+        VALUES (new.id, new.title, new.author, new.isbn, new.barcode);
+    END""",
+]
+
+# bm25 column weights: title, author, isbn, barcode
+FTS_SEARCH = text("""
+    SELECT books.id, books.title, books.author, books.isbn, books.barcode, books.status
+    FROM books_fts JOIN books ON books.id = books_fts.rowid
+    WHERE books_fts MATCH :query
+    ORDER BY bm25(books_fts, 10.0, 5.0, 2.0, 2.0)
+    LIMIT :limit
+""")
+
+# Vocabulary terms compared per misspelled word: same two-letter prefix,
+# similar length, and at most this many
+FUZZY_MAX_CANDIDATES = 2000
+FUZZY_LENGTH_SLACK = 2
+
+@instrument_methods
+class CatalogSearch:
+    """Ranked full-text search over title, author, ISBN and barcode.
+
+    On SQLite this uses an FTS5 index with prefix matching; when a query
+    finds fewer than `limit` books, misspelled words (not numbers) are
+    widened to close terms from the index vocabulary that share their first
+    two letters. Other databases fall back to LIKE.
+    """
+
+    def __init__(self, db_session):
+        self.session = db_session
+
+    @property
+    def uses_fts(self):
+        return self.session.get_bind().dialect.name == 'sqlite'
+
+    def install(self):
+        """Create the FTS index and triggers, filling the index on first install"""
+        if not self.uses_fts:
+            return
+        exists = self.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'books_fts'")).first()
+        for statement in FTS_SETUP:
+            self.session.execute(text(statement))
+        if not exists:
+            self.session.execute(text(
+                "INSERT INTO books_fts(books_fts) VALUES ('rebuild')"))
+        self.session.commit()
+
+    def search(self, query_text, limit=20):
+        """Returns: up to `limit` rows (id, title, author, isbn, barcode, status), best first"""
+        tokens = re.findall(r'\w+', query_text.lower())
+        if not tokens:
+            return []
+        if not self.uses_fts:
+            return self._like_search(tokens, limit)
+
+        results = self._fts_search([[token] for token in tokens], limit)
+        if len(results) < limit:
+            alternatives = [[token] + self._close_terms(token) for token in tokens]
+            if any(len(terms) > 1 for terms in alternatives):
+                fuzzy = self._fts_search(alternatives, limit)
+                seen = {row.id for row in results}
+                results += [row for row in fuzzy
+                            if row.id not in seen][:limit - len(results)]
+        return results
+
+    def _fts_search(self, alternatives, limit):
+        # Every word must match (as a prefix or one of its close terms)
+        match = " AND ".join(
+            "(" + " OR ".join(f'"{term}"*' for term in terms) + ")"
+            for terms in alternatives
+        )
+        return self.session.execute(FTS_SEARCH, {'query': match, 'limit': limit}).all()
+
+    def _close_terms(self, token, count=3):
+        # ISBNs and barcodes are typed or scanned exactly; only words get fuzzed
+        if len(token) < 3 or any(char.isdigit() for char in token):
+            return []
+        prefix = token[:2]
+        terms = self.session.execute(text(
+            "SELECT term FROM books_fts_vocab "
+            "WHERE term >= :start AND term < :end "
+            "AND length(term) BETWEEN :shortest AND :longest LIMIT :limit"
+        ), {
+            'start': prefix,
+            'end': prefix[:-1] + chr(ord(prefix[-1]) + 1),
+            'shortest': len(token) - FUZZY_LENGTH_SLACK,
+            'longest': len(token) + FUZZY_LENGTH_SLACK,
+            'limit': FUZZY_MAX_CANDIDATES
+        }).scalars().all()
+        return difflib.get_close_matches(token, terms, n=count, cutoff=0.75)
+
+    def _like_search(self, tokens, limit):
+        conditions = [or_(
+            Book.title.ilike(f"%{token}%"),
+            Book.author.ilike(f"%{token}%"),
+            Book.isbn.ilike(f"{token}%"),
+            Book.barcode.ilike(f"{token}%")
+        ) for token in tokens]
+        return self.session.query(
+            Book.id, Book.title, Book.author, Book.isbn, Book.barcode, Book.status
+        ).filter(and_(*conditions)).order_by(Book.title).limit(limit).all()
+# frontend/screens/diagnostics_panel.py
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTableWidget,
+                           QTableWidgetItem, QLabel)
+from PyQt6.QtCore import QTimer
+from backend.instrumentation import metrics
+from backend.services.cache import cache_stats
+
+class DiagnosticsPanel(QWidget):
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout(self)
+
+        header = QLabel("Diagnostics")
+        header.setStyleSheet("font-size: 18px; font-weight: bold;")
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(7)
+        self.table.setHorizontalHeaderLabels([
+            "Operation", "Calls", "Avg ms", "Max ms",
+            "Queries/Call", "DB ms/Call", "Total s"
+        ])
+
+        self.cache_label = QLabel()
+
+        layout.addWidget(header)
+        layout.addWidget(self.table)
+        layout.addWidget(self.cache_label)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(5000)
+        self.refresh()
+
+    def refresh(self):
+        operations = metrics.operations()
+        self.table.setRowCount(len(operations))
+        for row, op in enumerate(operations):
+            calls = op['calls'] or 1
+            values = [
+                op['operation'],
+                str(op['calls']),
+                f"{1000 * op['total_seconds'] / calls:.1f}",
+                f"{1000 * op['max_seconds']:.1f}",
+                f"{op['queries'] / calls:.1f}",
+                f"{1000 * op['db_seconds'] / calls:.1f}",
+                f"{op['total_seconds']:.2f}",
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+
+        self.cache_label.setText("   ".join(
+            f"{name} cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({100 * stats['hit_rate']:.0f}%)"
+            for name, stats in cache_stats().items()
+        ))
 # frontend/screens/main_window.py
-from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
+from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                            QPushButton, QLabel, QStackedWidget)
 from PyQt6.QtCore import Qt
+from frontend.screens.diagnostics_panel import DiagnosticsPanel
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -63,7 +659,9 @@ class MainWindow(QMainWindow):
             padding: 20px;
         """)
         
-        # Create navigation buttons
+        # Create navigation buttons and the page stack they switch
+        self.stack = QStackedWidget()
+        self.diagnostics_panel = None
         self.create_navigation_buttons()
         
         # Add widgets to layout
@@ -79,7 +677,8 @@ class MainWindow(QMainWindow):
             ("Books", self.show_books),
             ("Members", self.show_members),
             ("Issue/Return", self.show_transactions),
-            ("Donations", self.show_donations)
+            ("Donations", self.show_donations),
+            ("Diagnostics", self.show_diagnostics)
         ]
         
         for text, slot in buttons:
@@ -97,46 +696,253 @@ class MainWindow(QMainWindow):
             """)
             button.clicked.connect(slot)
             nav_layout.addWidget(button)
+
+    def show_diagnostics(self):
+        if self.diagnostics_panel is None:
+            self.diagnostics_panel = DiagnosticsPanel()
+            self.stack.addWidget(self.diagnostics_panel)
+        self.stack.setCurrentWidget(self.diagnostics_panel)
+# frontend/models/paged_table_model.py
+from collections import OrderedDict
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+class PagedTableModel(QAbstractTableModel):
+    """Table model that fetches rows page by page as the view scrolls.
+
+    fetch_page(after, limit, sort_column, descending, filter_text) must
+    return a list of (key, values) pairs ordered by key, starting after the
+    given key. Only max_cached_pages pages are kept; an evicted page is
+    fetched again from its start key when it scrolls back into view.
+    """
+
+    def __init__(self, headers, fetch_page, page_size=200, max_cached_pages=20,
+                 sort_column=None, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.max_cached_pages = max_cached_pages
+        self.sort_column = sort_column
+        self.default_sort_column = sort_column
+        self.descending = False
+        self.filter_text = None
+        self._pages = OrderedDict()
+        self._page_start_keys = []
+        self._row_count = 0
+        self._exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        page = self._page(index.row() // self.page_size)
+        offset = index.row() % self.page_size
+        if offset >= len(page):
+            return None
+        return page[offset][1][index.column()]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        page_number = len(self._page_start_keys)
+        start_key = self._next_start_key()
+        rows = self._fetch(start_key)
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if not rows:
+            return
+
+        self.beginInsertRows(QModelIndex(), self._row_count,
+                             self._row_count + len(rows) - 1)
+        self._page_start_keys.append(start_key)
+        self._store(page_number, rows)
+        self._row_count += len(rows)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # A cleared sort indicator passes -1
+        if not 0 <= column < len(self.headers):
+            column = self.default_sort_column
+        self.sort_column = column
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        self.refresh()
+
+    def set_filter_text(self, text):
+        self.filter_text = text or None
+        self.refresh()
+
+    def refresh(self):
+        """Drop every cached row and load the first page again"""
+        self.beginResetModel()
+        self._pages.clear()
+        self._page_start_keys = []
+        self._row_count = 0
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def _fetch(self, start_key):
+        return self.fetch_page(start_key, self.page_size, self.sort_column,
+                               self.descending, self.filter_text)
+
+    def _next_start_key(self):
+        if not self._page_start_keys:
+            return None
+        last_page = self._page(len(self._page_start_keys) - 1)
+        return last_page[-1][0] if last_page else None
+
+    def _page(self, page_number):
+        page = self._pages.get(page_number)
+        if page is None:
+            page = self._fetch(self._page_start_keys[page_number])
+            self._store(page_number, page)
+        else:
+            self._pages.move_to_end(page_number)
+        return page
+
+    def _store(self, page_number, rows):
+        self._pages[page_number] = rows
+        self._pages.move_to_end(page_number)
+        while len(self._pages) > self.max_cached_pages:
+            self._pages.popitem(last=False)
 # frontend/screens/book_management.py
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
-                           QPushButton, QTableWidget, QTableWidgetItem)
+                           QPushButton, QTableView, QLabel, QLineEdit,
+                           QCompleter)
+from PyQt6.QtCore import Qt, QStringListModel, QThreadPool, QTimer
+from frontend.models.paged_table_model import PagedTableModel
+from frontend.widgets.scanner_bridge import ScannerBridge
+from frontend.widgets.service_task import ServiceTask
+
+SEARCH_DEBOUNCE_MS = 200
 
 class BookManagement(QWidget):
-    def __init__(self):
+    """Book list with typeahead search.
+
+    Searches run on a worker thread, so catalog_search must have a database
+    session of its own rather than sharing book_service's.
+    """
+
+    def __init__(self, book_service, catalog_search):
         super().__init__()
+        self.book_service = book_service
+        self.catalog_search = catalog_search
+        self.scanner = None
+        # One search at a time; results for outdated text are dropped
+        self.search_pool = QThreadPool(self)
+        self.search_pool.setMaxThreadCount(1)
+        self._search_generation = 0
         layout = QVBoxLayout(self)
         
         # Create toolbar
         toolbar = QHBoxLayout()
         add_button = QPushButton("Add Book")
-        scan_button = QPushButton("Scan Barcode")
+        self.scan_button = QPushButton("Scan Barcode")
+        self.scan_button.setCheckable(True)
+        self.scan_button.toggled.connect(self.scan_barcode)
+        self.scan_label = QLabel()
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter by title, author, ISBN or barcode")
+        self.filter_input.returnPressed.connect(
+            lambda: self.model.set_filter_text(self.filter_input.text()))
+        
+        # Typeahead: search once typing pauses, not on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.update_suggestions)
+        self.filter_input.textEdited.connect(lambda text: self.search_timer.start())
+        self.suggestions = QStringListModel(self)
+        self.completer = QCompleter(self.suggestions, self)
+        self.completer.setCompletionMode(
+            QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.activated.connect(self.select_suggestion)
+        self.filter_input.setCompleter(self.completer)
+        self._suggested_barcodes = {}
         toolbar.addWidget(add_button)
-        toolbar.addWidget(scan_button)
+        toolbar.addWidget(self.scan_button)
+        toolbar.addWidget(self.scan_label)
+        toolbar.addWidget(self.filter_input)
         
-        # Create table
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels([
+        # Create table; rows are fetched page by page as the view scrolls
+        self.model = PagedTableModel([
             "ISBN", "Title", "Author", "Status", 
             "Donated", "Acquisition Date"
-        ])
+        ], self.book_service.fetch_page, sort_column=1, parent=self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        # Enabling sorting sorts by the indicator, which loads the first page
+        self.table.horizontalHeader().setSortIndicator(1, Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        self.table.verticalHeader().setDefaultSectionSize(24)
         
         layout.addLayout(toolbar)
         layout.addWidget(self.table)
         
-    def scan_barcode(self):
-        # Implement camera/scanner integration
-        pass
+    def scan_barcode(self, enabled=True):
+        # Continuous camera scanning while the button is checked
+        if enabled:
+            if self.scanner is None:
+                self.scanner = ScannerBridge(parent=self)
+                self.scanner.code_scanned.connect(self.on_barcode_scanned)
+                self.scanner.scan_failed.connect(self.on_scan_failed)
+            self.scanner.start()
+            self.scan_label.setText("Scanning...")
+        elif self.scanner is not None:
+            self.scanner.stop()
+            self.scan_label.setText("")
+
+    def update_suggestions(self):
+        self._search_generation += 1
+        generation = self._search_generation
+        task = ServiceTask(self.catalog_search.search, self.filter_input.text(), 15)
+        task.signals.finished.connect(
+            lambda results: self.show_suggestions(generation, results))
+        self.search_pool.start(task)
+
+    def show_suggestions(self, generation, results):
+        if generation != self._search_generation:
+            return
+        self._suggested_barcodes = {}
+        for book in results:
+            label = f"{book.title} - {book.author or 'Unknown'} ({book.barcode or book.isbn or ''})"
+            self._suggested_barcodes[label] = book.barcode or book.isbn or book.title
+        self.suggestions.setStringList(list(self._suggested_barcodes))
+        if results:
+            self.completer.complete()
+
+    def select_suggestion(self, label):
+        code = self._suggested_barcodes.get(label, label)
+        self.filter_input.setText(code)
+        self.model.set_filter_text(code)
+
+    def on_barcode_scanned(self, code):
+        self.scan_label.setText(f"Scanned: {code}")
+
+    def on_scan_failed(self, error):
+        self.scan_button.setChecked(False)
+        self.scan_label.setText(f"Scanner error: {error}")
         
     def add_book(self):
         # Implement add book dialog
         pass
 # backend/models/student.py
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.ext.declarative import declarative_base
-
-Base = declarative_base()
+from .base import Base
 
 class Student(Base):
     __tablename__ = 'students'
@@ -153,10 +959,18 @@ class Student(Base):
     email = Column(String(100))
     barcode_id = Column(String(50), unique=True)
     is_active = Column(Boolean, default=True)
+    # Maintained by CirculationService on issue/return
+    open_loan_count = Column(Integer, default=0, server_default='0', nullable=False)
 
     # Relationship with book transactions
     transactions = relationship("BookTransaction", back_populates="student")
 
+    __table_args__ = (
+        # Class rosters: filter on class/division/is_active, ordered by roll number
+        Index('ix_students_class_division_roll',
+              class_name, division, is_active, roll_number),
+    )
+
 class BookTransaction(Base):
     __tablename__ = 'book_transactions'
     
@@ -170,11 +984,37 @@ class BookTransaction(Base):
     
     student = relationship("Student", back_populates="transactions")
     book = relationship("Book")
+
+    __table_args__ = (
+        # Overdue scan: open loans by due date (partial where supported)
+        Index('ix_book_transactions_open_due', due_date,
+              sqlite_where=return_date.is_(None),
+              postgresql_where=return_date.is_(None)),
+        # A student's loans, open ones first
+        Index('ix_book_transactions_student_return', student_id, return_date),
+    )
 # backend/services/student_service.py
 from datetime import datetime
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
-from .models.student import Student
+from .models.book import Book
+from .models.student import Student, BookTransaction
+from .pagination import keyset_page
+from .cache import roster_cache
+from ..instrumentation import instrument_methods
+
+# Sortable columns of the student table, in display order
+STUDENT_SORT_COLUMNS = [
+    Student.roll_number,
+    func.coalesce(Student.admission_number, ''),
+    Student.first_name,
+    Student.class_name,
+    Student.division,
+    func.coalesce(Student.contact_number, ''),
+    Student.open_loan_count,
+]
 
+@instrument_methods
 class StudentService:
     def __init__(self, db_session: Session):
         self.session = db_session
@@ -193,129 +1033,1158 @@ class StudentService:
         )
         self.session.add(student)
         self.session.commit()
+        roster_cache.invalidate((student.class_name, student.division))
         return student
 
     def get_students_by_class(self, class_name, division):
-        return self.session.query(Student).filter_by(
-            class_name=class_name,
-            division=division,
-            is_active=True
-        ).order_by(Student.roll_number).all()
+        """Active students of a class in roll-number order, from the roster cache.
+        Returns: list of read-only rows (id, roll_number, admission_number,
+        first_name, last_name, class_name, division, email, barcode_id)
+        """
+        return roster_cache.get_or_load(
+            (class_name, division),
+            lambda: self.session.query(
+                Student.id, Student.roll_number, Student.admission_number,
+                Student.first_name, Student.last_name, Student.class_name,
+                Student.division, Student.email, Student.barcode_id
+            ).filter_by(
+                class_name=class_name,
+                division=division,
+                is_active=True
+            ).order_by(Student.roll_number).all()
+        )
 
     def get_student_books(self, student_id):
-        student = self.session.query(Student).get(student_id)
-        return [trans.book for trans in student.transactions 
-                if trans.return_date is None]
-# frontend/screens/student_management.py
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
-                           QPushButton, QTableWidget, QTableWidgetItem,
-                           QComboBox, QLabel, QLineEdit, QFormLayout,
-                           QDialog)
-
-class StudentManagementScreen(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.init_ui()
+        return self.session.query(Book).join(
+            BookTransaction, BookTransaction.book_id == Book.id
+        ).filter(
+            BookTransaction.student_id == student_id,
+            BookTransaction.return_date.is_(None)
+        ).all()
 
-    def init_ui(self):
-        layout = QVBoxLayout(self)
-        
-        # Standard library imports
-        import os
+    def fetch_page(self, class_name, division, after=None, limit=200,
+                   sort_column=0, descending=False, filter_text=None):
+        """One keyset page of a class roster for the student table.
+        Returns: list of (key, (roll, admission, name, class, division, contact, books issued))
+        """
+        sort_expression = STUDENT_SORT_COLUMNS[sort_column or 0]
+        query = self.session.query(
+            Student.id, Student.roll_number, Student.admission_number,
+            Student.first_name, Student.last_name, Student.class_name,
+            Student.division, Student.contact_number, Student.open_loan_count
+        ).filter(
+            Student.class_name == class_name,
+            Student.division == division,
+            Student.is_active.is_(True)
+        )
+        if filter_text:
+            pattern = f"%{filter_text}%"
+            query = query.filter(or_(
+                Student.first_name.ilike(pattern),
+                Student.last_name.ilike(pattern),
+                Student.admission_number.ilike(pattern)
+            ))
 
-        # Third-party imports
-        from dotenv import load_dotenv
+        return [(key, (
+            row.roll_number,
+            row.admission_number or '',
+            f"{row.first_name} {row.last_name or ''}".strip(),
+            row.class_name,
+            row.division,
+            row.contact_number or '',
+            row.open_loan_count
+        )) for key, row in keyset_page(query, sort_expression, Student.id, after,
+                                        limit, descending)]
 
-        # Local application imports
-        from backend.scheduler import NotificationScheduler
-        from backend.services.notification_service import NotificationService
+    def get_open_loan_count(self, student_id):
+        return self.session.query(Student.open_loan_count).filter(
+            Student.id == student_id
+        ).scalar()
+# backend/services/rollup_service.py
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, or_, update
+from ..models.book import Book
+from ..models.student import Student, BookTransaction
+from ..models.rollup import ClassDailyStats, TitleDailyStats
+from .report_service import loan_history
+from ..instrumentation import instrument_methods
 
-        # Load environment variables at the start
-        load_dotenv()
+@instrument_methods
+class RollupService:
+    """Maintain the daily circulation rollups.
 
-        filter_layout.addWidget(QLabel("Class:"))
-        filter_layout.addWidget(self.class_combo)
-        filter_layout.addWidget(QLabel("Division:"))
-        SMTP_USERNAME=your_email@gmail.com
-        SMTP_PASSWORD=your_app_specific_password
-        FROM_EMAIL=library@school.com
+    Issues and returns are added by CirculationService inside its own
+    transaction; the caller commits. Overdues are an end-of-day snapshot
+    taken by the scheduler. rebuild() recomputes everything from live and
+    archived loans.
+    """
 
+    def __init__(self, db_session):
+        self.session = db_session
 
-        # SMTP Configuration
-        SMTP_SERVER = "smtp.gmail.com"  # This is a standard value for Gmail
-        SMTP_PORT = 587  # Standard TLS port
-        SMTP_USERNAME = os.getenv('SMTP_USERNAME')
-        SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
-        FROM_EMAIL = os.getenv('FROM_EMAIL')
+    def _write(self, model, keys, values, increment=True):
+        """Update the row for keys, inserting it if it does not exist yet"""
+        if increment:
+            values_clause = {name: getattr(model, name) + value
+                             for name, value in values.items()}
+        else:
+            values_clause = values
+        updated = self.session.execute(
+            update(model).where(
+                *[getattr(model, name) == value for name, value in keys.items()]
+            ).values(**values_clause).execution_options(synchronize_session=False)
+        ).rowcount
+        if not updated:
+            self.session.execute(insert(model).values(**keys, **values))
 
-        add_button = QPushButton("Add Student")
-        add_button.clicked.connect(self.show_add_student_dialog)
-        toolbar.addWidget(add_button)
-        
-        # Student Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels([
-            "Roll No.", "Admission No.", "Name", 
-            "Class", "Division", "Contact", "Books Issued"
-        ])
-        
-        layout.addLayout(filter_layout)
-        layout.addLayout(toolbar)
-        layout.addWidget(self.table)
-        
-        # Connect signals
-        self.class_combo.currentTextChanged.connect(self.refresh_student_list)
-        self.division_combo.currentTextChanged.connect(self.refresh_student_list)
+    def record_loans(self, column, day, loans):
+        """Add issued or returned loans to the rollups of day.
 
-    def refresh_student_list(self):
-        # Implementation to refresh the student list based on class/division
-        pass
+        column is 'issues' or 'returns'; loans are (student_id, book_id) pairs.
+        """
+        if not loans:
+            return
+        classes = {
+            row.id: (row.class_name, row.division) for row in self.session.query(
+                Student.id, Student.class_name, Student.division
+            ).filter(Student.id.in_({student_id for student_id, _ in loans}))
+        }
+        titles = dict(self.session.query(Book.id, Book.title).filter(
+            Book.id.in_({book_id for _, book_id in loans})).all())
 
-class AddStudentDialog(QDialog):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("Add New Student")
-        self.setup_ui()
+        class_counts = Counter(classes[student_id] for student_id, _ in loans
+                               if student_id in classes)
+        title_counts = Counter(titles[book_id] for _, book_id in loans
+                               if book_id in titles)
+        for (class_name, division), count in class_counts.items():
+            self._write(ClassDailyStats,
+                        {'day': day, 'class_name': class_name, 'division': division},
+                        {column: count})
+        for title, count in title_counts.items():
+            self._write(TitleDailyStats, {'day': day, 'title': title}, {column: count})
 
-    def setup_ui(self):
-        layout = QFormLayout(self)
-        
-        # Create input fields
-        self.admission_number = QLineEdit()
-        self.roll_number = QLineEdit()
-        self.first_name = QLineEdit()
-        self.last_name = QLineEdit()
-        self.class_combo = QComboBox()
-        self.class_combo.addItems([str(i) for i in range(1, 13)])
-        self.division_combo = QComboBox()
-        self.division_combo.addItems(['A', 'B', 'C', 'D'])
-        self.contact = QLineEdit()
-        self.parent_contact = QLineEdit()
-        self.email = QLineEdit()
-        
-        # Add fields to form
-        layout.addRow("Admission Number:", self.admission_number)
-        layout.addRow("Roll Number:", self.roll_number)
-        layout.addRow("First Name:", self.first_name)
-        layout.addRow("Last Name:", self.last_name)
-        layout.addRow("Class:", self.class_combo)
-        layout.addRow("Division:", self.division_combo)
-        layout.addRow("Contact:", self.contact)
-        layout.addRow("Parent Contact:", self.parent_contact)
-        layout.addRow("Email:", self.email)
-        
-        # Add buttons
-        button_box = QHBoxLayout()
-        save_button = QPushButton("Save")
-        cancel_button = QPushButton("Cancel")
-        
-        save_button.clicked.connect(self.save_student)
-        cancel_button.clicked.connect(self.reject)
-        
-        button_box.addWidget(save_button)
-        button_box.addWidget(cancel_button)
-        layout.addRow(button_box)
+    def snapshot_overdues(self, day=None):
+        """Record the loans still overdue at the end of day, per class/division.
+        Returns: total overdue loans
+        """
+        day = day or datetime.now().date()
+        counts = self.session.query(
+            Student.class_name,
+            Student.division,
+            func.count(BookTransaction.id)
+        ).join(
+            Student, Student.id == BookTransaction.student_id
+        ).filter(
+            BookTransaction.return_date.is_(None),
+            BookTransaction.due_date < day
+        ).group_by(Student.class_name, Student.division).all()
+
+        try:
+            self.session.execute(
+                update(ClassDailyStats).where(ClassDailyStats.day == day).values(
+                    overdues=0).execution_options(synchronize_session=False)
+            )
+            for class_name, division, count in counts:
+                self._write(ClassDailyStats,
+                            {'day': day, 'class_name': class_name, 'division': division},
+                            {'overdues': count}, increment=False)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return sum(count for _, _, count in counts)
+
+    def backfill_overdues(self, since, until=None):
+        """Rewrite the overdue counts of every day from since to until from
+        the loan history, for days whose snapshot was missed.
+        Returns: total overdue loans at the end of until
+        """
+        until = until or datetime.now().date()
+        history = self._overdue_history(loan_history(), until)
+        try:
+            self.session.execute(
+                update(ClassDailyStats).where(
+                    ClassDailyStats.day.between(since, until)
+                ).values(overdues=0).execution_options(synchronize_session=False)
+            )
+            for (day, class_name, division), count in history.items():
+                if day >= since:
+                    self._write(ClassDailyStats,
+                                {'day': day, 'class_name': class_name,
+                                 'division': division},
+                                {'overdues': count}, increment=False)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return sum(count for (day, _, _), count in history.items() if day == until)
+
+    def _grouped_counts(self, loans, date_column, *conditions):
+        return self.session.query(
+            date_column, Student.class_name, Student.division,
+            func.count(loans.c.id)
+        ).select_from(loans).join(
+            Student, Student.id == loans.c.student_id
+        ).filter(*conditions).group_by(
+            date_column, Student.class_name, Student.division
+        ).all()
+
+    def _overdue_history(self, loans, until):
+        """Overdue loans per (day, class, division) from the loan history.
+
+        A loan is overdue at the end of every day after its due date until
+        the day it is returned, so it adds one from due_date + 1 and removes
+        one on return_date; a running sum gives the daily counts.
+        """
+        changes = defaultdict(Counter)
+        for due_date, class_name, division, count in self._grouped_counts(
+                loans, loans.c.due_date,
+                loans.c.due_date < until,
+                or_(loans.c.return_date.is_(None),
+                    loans.c.return_date > loans.c.due_date)):
+            changes[(class_name, division)][due_date + timedelta(days=1)] += count
+        for return_date, class_name, division, count in self._grouped_counts(
+                loans, loans.c.return_date,
+                loans.c.return_date.isnot(None),
+                loans.c.return_date > loans.c.due_date):
+            changes[(class_name, division)][return_date] -= count
+
+        overdues = {}
+        for class_key, deltas in changes.items():
+            running = 0
+            day = min(deltas)
+            while day <= until:
+                running += deltas.get(day, 0)
+                if running:
+                    overdues[(day,) + class_key] = running
+                day += timedelta(days=1)
+        return overdues
+
+    def rebuild(self, until=None):
+        """Recompute both rollup tables from the transaction history.
+        Returns: dict with the number of 'class_rows' and 'title_rows' written
+        """
+        until = until or datetime.now().date()
+        loans = loan_history()
+        class_rows = defaultdict(lambda: {'issues': 0, 'returns': 0, 'overdues': 0})
+        for day, class_name, division, count in self._grouped_counts(
+                loans, loans.c.issue_date):
+            class_rows[(day, class_name, division)]['issues'] = count
+        for day, class_name, division, count in self._grouped_counts(
+                loans, loans.c.return_date, loans.c.return_date.isnot(None)):
+            class_rows[(day, class_name, division)]['returns'] = count
+        for key, count in self._overdue_history(loans, until).items():
+            class_rows[key]['overdues'] = count
+
+        title_rows = defaultdict(lambda: {'issues': 0, 'returns': 0})
+        for date_column, column, conditions in (
+                (loans.c.issue_date, 'issues', ()),
+                (loans.c.return_date, 'returns', (loans.c.return_date.isnot(None),))):
+            for day, title, count in self.session.query(
+                date_column, Book.title, func.count(loans.c.id)
+            ).select_from(loans).join(
+                Book, Book.id == loans.c.book_id
+            ).filter(*conditions).group_by(date_column, Book.title):
+                title_rows[(day, title)][column] = count
+
+        try:
+            self.session.execute(delete(ClassDailyStats))
+            self.session.execute(delete(TitleDailyStats))
+            self.session.bulk_insert_mappings(ClassDailyStats, [
+                {'day': day, 'class_name': class_name, 'division': division, **counts}
+                for (day, class_name, division), counts in class_rows.items()
+            ])
+            self.session.bulk_insert_mappings(TitleDailyStats, [
+                {'day': day, 'title': title, **counts}
+                for (day, title), counts in title_rows.items()
+            ])
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return {'class_rows': len(class_rows), 'title_rows': len(title_rows)}
+# backend/services/circulation_service.py
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import exists, func, or_, select, update
+from ..models.book import Book
+from ..models.student import Student, BookTransaction
+from .student_service import StudentService
+from .rollup_service import RollupService
+from ..instrumentation import instrument_methods
+
+@instrument_methods
+class CirculationService:
+    """Issue and return books.
+
+    Book.status, Student.open_loan_count and the daily rollups are updated
+    in the same database transaction as the BookTransaction they belong to.
+    """
+
+    def __init__(self, db_session, loan_days=14):
+        self.session = db_session
+        self.loan_days = loan_days
+        self.rollups = RollupService(db_session)
+
+    def issue_book(self, student_id, book_id, issue_date=None):
+        issue_date = issue_date or datetime.now().date()
+        try:
+            # Claim the book only if nobody else has it
+            claimed = self.session.execute(
+                update(Book).where(
+                    Book.id == book_id,
+                    or_(Book.status == 'Available', Book.status.is_(None))
+                ).values(status='Issued').execution_options(synchronize_session=False)
+            ).rowcount
+            if not claimed:
+                raise ValueError(f"Book {book_id} is not available")
+
+            transaction = BookTransaction(
+                book_id=book_id,
+                student_id=student_id,
+                issue_date=issue_date,
+                due_date=issue_date + timedelta(days=self.loan_days)
+            )
+            self.session.add(transaction)
+            self.session.execute(
+                update(Student).where(Student.id == student_id).values(
+                    open_loan_count=Student.open_loan_count + 1
+                ).execution_options(synchronize_session=False)
+            )
+            self.rollups.record_loans('issues', issue_date, [(student_id, book_id)])
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return transaction
+
+    def return_book(self, book_id, return_date=None):
+        return_date = return_date or datetime.now().date()
+        try:
+            transaction = self.session.query(BookTransaction).filter(
+                BookTransaction.book_id == book_id,
+                BookTransaction.return_date.is_(None)
+            ).first()
+            if transaction is None:
+                raise ValueError(f"Book {book_id} is not on loan")
+
+            # Only one concurrent return of the loan can close it
+            returned = self.session.execute(
+                update(BookTransaction).where(
+                    BookTransaction.id == transaction.id,
+                    BookTransaction.return_date.is_(None)
+                ).values(return_date=return_date).execution_options(
+                    synchronize_session=False)
+            ).rowcount
+            if not returned:
+                raise ValueError(f"Book {book_id} was returned elsewhere in the meantime")
+
+            self.session.execute(
+                update(Book).where(Book.id == book_id).values(
+                    status='Available'
+                ).execution_options(synchronize_session=False)
+            )
+            self.session.execute(
+                update(Student).where(Student.id == transaction.student_id).values(
+                    open_loan_count=Student.open_loan_count - 1
+                ).execution_options(synchronize_session=False)
+            )
+            self.rollups.record_loans(
+                'returns', return_date, [(transaction.student_id, book_id)])
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return transaction
+
+    def issue_class_set(self, class_name, division, barcodes, issue_date=None):
+        """Issue one scanned copy to every active student of a class/division.
+
+        Copies are handed out in roll-number order; extra copies stay on the
+        shelf. All copies are validated with one query and every loan, book
+        status and counter is written in a single database transaction.
+        Returns: list of (student_id, book_id) pairs that were issued
+        """
+        issue_date = issue_date or datetime.now().date()
+        students = StudentService(self.session).get_students_by_class(
+            class_name, division)
+        if not students:
+            raise ValueError(f"No active students in class {class_name}-{division}")
+
+        barcodes = list(dict.fromkeys(barcodes))
+        if len(barcodes) < len(students):
+            raise ValueError(
+                f"{len(barcodes)} copies scanned for {len(students)} students")
+        barcodes = barcodes[:len(students)]
+
+        # Validate availability of every copy in one query
+        books = {
+            book.barcode: book for book in self.session.query(
+                Book.id, Book.barcode, Book.status
+            ).filter(Book.barcode.in_(barcodes))
+        }
+        missing = [code for code in barcodes if code not in books]
+        unavailable = [code for code, book in books.items()
+                       if book.status not in ('Available', None)]
+        if missing or unavailable:
+            raise ValueError(
+                f"Cannot issue class set: unknown barcodes {missing}, "
+                f"not available {unavailable}")
+
+        pairs = [(student.id, books[code].id)
+                 for student, code in zip(students, barcodes)]
+        book_ids = [book_id for _, book_id in pairs]
+        student_ids = [student_id for student_id, _ in pairs]
+        due_date = issue_date + timedelta(days=self.loan_days)
+
+        try:
+            claimed = self.session.execute(
+                update(Book).where(
+                    Book.id.in_(book_ids),
+                    or_(Book.status == 'Available', Book.status.is_(None))
+                ).values(status='Issued').execution_options(synchronize_session=False)
+            ).rowcount
+            if claimed != len(book_ids):
+                raise ValueError("Some copies were issued elsewhere in the meantime")
+
+            self.session.bulk_insert_mappings(BookTransaction, [{
+                'book_id': book_id,
+                'student_id': student_id,
+                'issue_date': issue_date,
+                'due_date': due_date
+            } for student_id, book_id in pairs])
+            self.session.execute(
+                update(Student).where(Student.id.in_(student_ids)).values(
+                    open_loan_count=Student.open_loan_count + 1
+                ).execution_options(synchronize_session=False)
+            )
+            self.rollups.record_loans('issues', issue_date, pairs)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return pairs
+
+    def return_books(self, barcodes, return_date=None):
+        """Close the open loans of all scanned copies at once.
+        Returns: dict with 'returned' count and barcodes 'not_on_loan'
+        """
+        return_date = return_date or datetime.now().date()
+        barcodes = list(dict.fromkeys(barcodes))
+        open_loans = self.session.query(
+            BookTransaction.id,
+            BookTransaction.book_id,
+            BookTransaction.student_id,
+            Book.barcode
+        ).join(
+            Book, Book.id == BookTransaction.book_id
+        ).filter(
+            Book.barcode.in_(barcodes),
+            BookTransaction.return_date.is_(None)
+        ).all()
+
+        returned_barcodes = {loan.barcode for loan in open_loans}
+        not_on_loan = [code for code in barcodes if code not in returned_barcodes]
+        if not open_loans:
+            return {'returned': 0, 'not_on_loan': not_on_loan}
+
+        # Students with several returned copies get one decrement per count
+        students_by_count = {}
+        for student_id, count in Counter(loan.student_id for loan in open_loans).items():
+            students_by_count.setdefault(count, []).append(student_id)
+
+        try:
+            returned = self.session.execute(
+                update(BookTransaction).where(
+                    BookTransaction.id.in_([loan.id for loan in open_loans]),
+                    BookTransaction.return_date.is_(None)
+                ).values(return_date=return_date).execution_options(
+                    synchronize_session=False)
+            ).rowcount
+            if returned != len(open_loans):
+                raise ValueError("Some copies were returned elsewhere in the meantime")
+
+            self.session.execute(
+                update(Book).where(
+                    Book.id.in_([loan.book_id for loan in open_loans])
+                ).values(status='Available').execution_options(
+                    synchronize_session=False)
+            )
+            for count, student_ids in students_by_count.items():
+                self.session.execute(
+                    update(Student).where(Student.id.in_(student_ids)).values(
+                        open_loan_count=Student.open_loan_count - count
+                    ).execution_options(synchronize_session=False)
+                )
+            self.rollups.record_loans('returns', return_date, [
+                (loan.student_id, loan.book_id) for loan in open_loans])
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return {'returned': returned, 'not_on_loan': not_on_loan}
+
+    def reconcile_counters(self):
+        """Recompute open-loan counters and book availability from the loans table.
+        Returns: dict with the number of 'students' and 'books' repaired
+        """
+        open_loans = select(func.count(BookTransaction.id)).where(
+            BookTransaction.student_id == Student.id,
+            BookTransaction.return_date.is_(None)
+        ).scalar_subquery()
+        has_open_loan = exists().where(
+            BookTransaction.book_id == Book.id,
+            BookTransaction.return_date.is_(None)
+        )
+
+        try:
+            students = self.session.execute(
+                update(Student).where(
+                    Student.open_loan_count != open_loans
+                ).values(open_loan_count=open_loans).execution_options(
+                    synchronize_session=False)
+            ).rowcount
+            # Lost books keep their status even while a loan is open
+            issued = self.session.execute(
+                update(Book).where(
+                    has_open_loan,
+                    or_(Book.status == 'Available', Book.status.is_(None))
+                ).values(status='Issued').execution_options(
+                    synchronize_session=False)
+            ).rowcount
+            available = self.session.execute(
+                update(Book).where(
+                    ~has_open_loan,
+                    Book.status == 'Issued'
+                ).values(status='Available').execution_options(
+                    synchronize_session=False)
+            ).rowcount
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+        return {'students': students, 'books': issued + available}
+# backend/services/lookup_index.py
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from ..models.book import Book
+from ..models.student import Student
+
+def normalize_code(code):
+    return str(code).strip().upper()
+
+def class_roll_key(class_name, division, roll_number):
+    """Key such as "10A-23" for roll 23 in class 10, division A"""
+    return normalize_code(f"{class_name}{division}-{roll_number}")
+
+class BarcodeIndex:
+    """In-process lookup from scanned codes to record ids.
+
+    Books are keyed by barcode and ISBN; students by barcode id, admission
+    number and class-roll key. Once watch() is called, rows added, changed
+    or deleted through an ORM session are applied when the session commits.
+    Bulk statements bypass the ORM, so callers using them should reload().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._books = {}
+        self._students = {}
+        # id -> keys currently indexed for it, so stale keys can be dropped
+        self._book_keys = {}
+        self._student_keys = {}
+
+    def load(self, session):
+        """Build the index from scratch with two column-only queries"""
+        books, book_keys = {}, {}
+        for book_id, barcode, isbn in session.query(Book.id, Book.barcode, Book.isbn):
+            keys = self._keys(barcode, isbn)
+            book_keys[book_id] = keys
+            for key in keys:
+                books[key] = book_id
+
+        students, student_keys = {}, {}
+        for row in session.query(Student.id, Student.barcode_id, Student.admission_number,
+                                 Student.class_name, Student.division, Student.roll_number):
+            keys = self._student_row_keys(row.barcode_id, row.admission_number,
+                                          row.class_name, row.division, row.roll_number)
+            student_keys[row.id] = keys
+            for key in keys:
+                students[key] = row.id
+
+        with self._lock:
+            self._books, self._book_keys = books, book_keys
+            self._students, self._student_keys = students, student_keys
+
+    reload = load
+
+    @staticmethod
+    def _keys(*values):
+        return tuple(normalize_code(value) for value in values if value)
+
+    @classmethod
+    def _student_row_keys(cls, barcode_id, admission_number, class_name, division,
+                          roll_number):
+        keys = cls._keys(barcode_id, admission_number)
+        if class_name and division and roll_number is not None:
+            keys += (class_roll_key(class_name, division, roll_number),)
+        return keys
+
+    def resolve_book(self, code):
+        return self._books.get(normalize_code(code))
+
+    def resolve_student(self, code):
+        return self._students.get(normalize_code(code))
+
+    def resolve(self, code):
+        """Returns: ('book', id), ('student', id) or None"""
+        key = normalize_code(code)
+        book_id = self._books.get(key)
+        if book_id is not None:
+            return ('book', book_id)
+        student_id = self._students.get(key)
+        if student_id is not None:
+            return ('student', student_id)
+        return None
+
+    def put_book(self, book_id, barcode, isbn):
+        self._put(self._books, self._book_keys, book_id, self._keys(barcode, isbn))
+
+    def put_student(self, student_id, barcode_id, admission_number, class_name,
+                    division, roll_number):
+        keys = self._student_row_keys(barcode_id, admission_number, class_name,
+                                      division, roll_number)
+        self._put(self._students, self._student_keys, student_id, keys)
+
+    def remove_book(self, book_id):
+        self._put(self._books, self._book_keys, book_id, ())
+
+    def remove_student(self, student_id):
+        self._put(self._students, self._student_keys, student_id, ())
+
+    def _put(self, index, keys_by_id, record_id, keys):
+        with self._lock:
+            for key in keys_by_id.pop(record_id, ()):
+                if index.get(key) == record_id:
+                    del index[key]
+            if keys:
+                keys_by_id[record_id] = keys
+                for key in keys:
+                    index[key] = record_id
+
+    def __len__(self):
+        return len(self._book_keys) + len(self._student_keys)
+
+    def watch(self, session_class=Session):
+        """Keep the index current with changes committed through session_class"""
+        event.listen(session_class, 'after_flush', self._collect_changes)
+        event.listen(session_class, 'after_commit', self._apply_changes)
+        event.listen(session_class, 'after_rollback', self._discard_changes)
+
+    def _collect_changes(self, session, flush_context):
+        pending = session.info.setdefault('barcode_index_changes', [])
+        for instance in list(session.new) + list(session.dirty):
+            if isinstance(instance, Book):
+                pending.append((self.put_book, (instance.id, instance.barcode,
+                                                instance.isbn)))
+            elif isinstance(instance, Student):
+                pending.append((self.put_student, (
+                    instance.id, instance.barcode_id, instance.admission_number,
+                    instance.class_name, instance.division, instance.roll_number)))
+        for instance in session.deleted:
+            if isinstance(instance, Book):
+                pending.append((self.remove_book, (instance.id,)))
+            elif isinstance(instance, Student):
+                pending.append((self.remove_student, (instance.id,)))
+
+    def _apply_changes(self, session):
+        for method, args in session.info.pop('barcode_index_changes', []):
+            method(*args)
+
+    def _discard_changes(self, session):
+        session.info.pop('barcode_index_changes', None)
+
+# Shared index for the issue desk, loaded at startup
+barcode_index = BarcodeIndex()
+# backend/services/student_resolver.py
+import logging
+import re
+import time
+from bisect import bisect_left
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from ..models.student import Student
+from .lookup_index import barcode_index, class_roll_key
+from ..instrumentation import instrument_methods
+
+# "10A-23", "10 A 23", "10-A-23": class, division, roll number
+CLASS_ROLL_PATTERN = re.compile(r'^\s*(\d{1,2})\s*-?\s*([A-Za-z])\s*[-/ ]\s*(\d{1,3})\s*$')
+
+# Lookups slower than this (after any name list reload) are logged
+STUDENT_LOOKUP_BUDGET_MS = 5.0
+
+logger = logging.getLogger(__name__)
+
+class StudentNameChanges:
+    """Counts changes to student names so every resolver knows when to reload.
+
+    One set of session listeners serves all resolvers; writes that bypass
+    the ORM events (bulk imports) call invalidate() themselves.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._watching = False
+
+    def invalidate(self):
+        self.version += 1
+
+    def watch(self, session_class=Session):
+        """Bump the version after a commit that touched students"""
+        if self._watching:
+            return
+        event.listen(session_class, 'after_flush', self._note_student_changes)
+        event.listen(session_class, 'after_commit', self._apply_changes)
+        self._watching = True
+
+    def _note_student_changes(self, session, flush_context):
+        changed = list(session.new) + list(session.dirty) + list(session.deleted)
+        if any(isinstance(instance, Student) for instance in changed):
+            session.info['student_names_changed'] = True
+
+    def _apply_changes(self, session):
+        if session.info.pop('student_names_changed', False):
+            self.invalidate()
+
+student_name_changes = StudentNameChanges()
+
+@instrument_methods
+class StudentResolver:
+    """Resolves issue-desk input to ranked student candidates.
+
+    Accepts an admission number or student barcode, a class-division-roll
+    key such as "10A-23", or the start of a first or last name. Exact keys
+    come from the shared barcode index and names from a sorted in-memory
+    token list; the candidates and their open-loan counts are then loaded
+    in one query.
+    """
+
+    def __init__(self, db_session, index=barcode_index, changes=student_name_changes):
+        self.session = db_session
+        self.index = index
+        self.changes = changes
+        self._name_tokens = []
+        # student id -> lower-cased (first name, last name), for ordering
+        self._names = {}
+        # changes.version the name list was loaded at
+        self._loaded_version = None
+
+    def invalidate(self):
+        """Reload the name list on the next lookup"""
+        self._loaded_version = None
+
+    def load(self):
+        version = self.changes.version
+        tokens = []
+        names = {}
+        for student_id, first_name, last_name in self.session.query(
+                Student.id, Student.first_name, Student.last_name).filter(
+                Student.is_active.is_(True)):
+            names[student_id] = (first_name.lower(), (last_name or '').lower())
+            for part in f"{first_name} {last_name or ''}".lower().split():
+                tokens.append((part, student_id))
+        tokens.sort()
+        self._name_tokens = tokens
+        self._names = names
+        self._loaded_version = version
+
+    def _ids_for_name(self, text):
+        words = text.lower().split()
+        matches = None
+        for word in words:
+            ids = set()
+            start = bisect_left(self._name_tokens, (word,))
+            for token, student_id in self._name_tokens[start:]:
+                if not token.startswith(word):
+                    break
+                ids.add(student_id)
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                break
+        return matches or set()
+
+    def resolve(self, text, limit=10):
+        """Returns: up to `limit` rows (id, admission_number, first_name,
+        last_name, class_name, division, roll_number, open_loan_count), best first
+        """
+        text = text.strip()
+        if not text:
+            return []
+        if self._loaded_version != self.changes.version:
+            self.load()
+        started = time.perf_counter()
+        rows = self._resolve(text, limit)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > STUDENT_LOOKUP_BUDGET_MS:
+            logger.warning(f"Student lookup for {text!r} took {elapsed_ms:.1f} ms "
+                           f"(budget {STUDENT_LOOKUP_BUDGET_MS} ms)")
+        return rows
+
+    def _resolve(self, text, limit):
+        # Rank 0: exact admission number, barcode or class-roll key
+        ranks = {}
+        key = text
+        match = CLASS_ROLL_PATTERN.match(text)
+        if match:
+            class_name, division, roll_number = match.groups()
+            key = class_roll_key(class_name, division, int(roll_number))
+        student_id = self.index.resolve_student(key)
+        if student_id is not None:
+            ranks[student_id] = 0
+
+        # Rank 1: every word of the input starts a word of the name
+        if not match:
+            for student_id in self._ids_for_name(text):
+                ranks.setdefault(student_id, 1)
+
+        if not ranks:
+            return []
+        candidates = sorted(ranks, key=lambda student_id: (
+            ranks[student_id], self._names.get(student_id, ('', ''))))[:limit]
+        rows = self.session.query(
+            Student.id, Student.admission_number, Student.first_name,
+            Student.last_name, Student.class_name, Student.division,
+            Student.roll_number, Student.open_loan_count
+        ).filter(
+            Student.id.in_(candidates),
+            # The barcode index also knows deactivated students
+            Student.is_active.is_(True)
+        ).all()
+        rows.sort(key=lambda row: (ranks[row.id], row.first_name.lower(),
+                                   (row.last_name or '').lower()))
+        return rows[:limit]
+# backend/services/import_service.py
+import csv
+import re
+from datetime import date, datetime
+from sqlalchemy import or_
+from ..models.book import Book
+from ..models.student import Student
+from .cache import roster_cache
+from .lookup_index import barcode_index
+from .student_resolver import student_name_changes
+from ..instrumentation import instrument_methods
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+def read_rows(path):
+    """Yield rows of a CSV or XLSX file as dicts keyed by snake_case header"""
+    def normalize(header):
+        return re.sub(r'[^a-z0-9]+', '_', str(header or '').strip().lower()).strip('_')
+
+    if path.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            headers = [normalize(header) for header in next(rows, [])]
+            for values in rows:
+                yield dict(zip(headers, values))
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            headers = [normalize(header) for header in next(reader, [])]
+            for values in reader:
+                yield dict(zip(headers, values))
+
+def _text(row, column, required=False, max_length=None):
+    value = row.get(column)
+    value = str(value).strip() if value is not None else ''
+    if required and not value:
+        raise ValueError(f"Missing {column}")
+    if max_length and len(value) > max_length:
+        raise ValueError(f"{column} is longer than {max_length} characters")
+    return value or None
+
+def validate_student(row):
+    mapping = {
+        'admission_number': _text(row, 'admission_number', required=True, max_length=20),
+        'first_name': _text(row, 'first_name', required=True, max_length=50),
+        'last_name': _text(row, 'last_name', max_length=50),
+        'class_name': _text(row, 'class_name', required=True, max_length=10),
+        'division': _text(row, 'division', required=True, max_length=2).upper(),
+        'contact_number': _text(row, 'contact_number', max_length=15),
+        'parent_contact': _text(row, 'parent_contact', max_length=15),
+        'email': _text(row, 'email', max_length=100),
+        'barcode_id': _text(row, 'barcode_id', max_length=50),
+    }
+    roll_number = _text(row, 'roll_number', required=True)
+    try:
+        mapping['roll_number'] = int(float(roll_number))
+    # "inf" and "1e400" parse as infinite floats
+    except (ValueError, OverflowError):
+        raise ValueError(f"Invalid roll_number: {roll_number}")
+    return {column: value for column, value in mapping.items()
+            if value is not None}
+
+def validate_book(row):
+    isbn = _text(row, 'isbn')
+    if isbn:
+        isbn = isbn.replace('-', '').replace(' ', '')
+        if not re.fullmatch(r'\d{9}[\dX]|\d{13}', isbn.upper()):
+            raise ValueError(f"Invalid ISBN: {isbn}")
+    mapping = {
+        'isbn': isbn,
+        'barcode': _text(row, 'barcode', max_length=50),
+        'title': _text(row, 'title', required=True, max_length=200),
+        'author': _text(row, 'author', max_length=200),
+        'status': _text(row, 'status', max_length=20),
+    }
+    if not mapping['isbn'] and not mapping['barcode']:
+        raise ValueError("Missing isbn and barcode")
+    donated = _text(row, 'is_donated')
+    if donated is not None:
+        mapping['is_donated'] = donated.lower() in TRUE_VALUES
+    acquired = row.get('acquisition_date')
+    if isinstance(acquired, datetime):
+        mapping['acquisition_date'] = acquired.date()
+    elif isinstance(acquired, date):
+        mapping['acquisition_date'] = acquired
+    elif _text(row, 'acquisition_date'):
+        try:
+            mapping['acquisition_date'] = date.fromisoformat(_text(row, 'acquisition_date'))
+        except ValueError:
+            raise ValueError(f"Invalid acquisition_date: {acquired} (use YYYY-MM-DD)")
+    return {column: value for column, value in mapping.items()
+            if value is not None}
+
+@instrument_methods
+class ImportService:
+    """Bulk import of students and books from CSV or XLSX files.
+
+    Rows are validated and upserted in chunks, each chunk in its own
+    transaction. Bad rows are reported instead of aborting the import.
+    """
+
+    def __init__(self, db_session, chunk_size=1000):
+        self.session = db_session
+        self.chunk_size = chunk_size
+
+    def import_students(self, path):
+        """Upsert students by admission number.
+        Returns: dict with 'inserted', 'updated' and per-row 'errors'
+        """
+        return self._import(Student, read_rows(path), validate_student,
+                            self._existing_students)
+
+    def import_books(self, path):
+        """Upsert books by ISBN, or by barcode for books without one.
+        Returns: dict with 'inserted', 'updated' and per-row 'errors'
+        """
+        return self._import(Book, read_rows(path), validate_book,
+                            self._existing_books)
+
+    def _existing_students(self, mappings):
+        numbers = [mapping['admission_number'] for mapping in mappings]
+        existing = dict(self.session.query(Student.admission_number, Student.id).filter(
+            Student.admission_number.in_(numbers)))
+        return [existing.get(mapping['admission_number']) for mapping in mappings]
+
+    def _existing_books(self, mappings):
+        # Rows with an ISBN match on it alone; barcodes only identify books
+        # imported without one
+        isbns = [mapping['isbn'] for mapping in mappings if mapping.get('isbn')]
+        barcodes = [mapping['barcode'] for mapping in mappings
+                    if not mapping.get('isbn') and mapping.get('barcode')]
+        by_isbn, by_barcode = {}, {}
+        for book_id, isbn, barcode in self.session.query(Book.id, Book.isbn, Book.barcode).filter(
+                or_(Book.isbn.in_(isbns), Book.barcode.in_(barcodes))):
+            if isbn is not None:
+                by_isbn[isbn] = book_id
+            if barcode is not None:
+                by_barcode[barcode] = book_id
+        return [by_isbn.get(mapping['isbn']) if mapping.get('isbn')
+                else by_barcode.get(mapping.get('barcode'))
+                for mapping in mappings]
+
+    def _import(self, model, rows, validate, find_existing):
+        report = {'inserted': 0, 'updated': 0, 'errors': []}
+        chunk = []
+        # Row 1 is the header
+        for line, row in enumerate(rows, start=2):
+            if not any(value not in (None, '') for value in row.values()):
+                continue
+            try:
+                chunk.append((line, validate(row)))
+            except ValueError as e:
+                report['errors'].append({'row': line, 'error': str(e)})
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(model, chunk, find_existing, report)
+                chunk = []
+        if chunk:
+            self._write_chunk(model, chunk, find_existing, report)
+
+        # Bulk writes bypass the ORM events that keep the index current
+        if report['inserted'] or report['updated']:
+            barcode_index.reload(self.session)
+            if model is Student:
+                roster_cache.clear()
+                student_name_changes.invalidate()
+        return report
+
+    def _write_chunk(self, model, chunk, find_existing, report):
+        inserts, updates = [], []
+        seen = set()
+        existing_ids = find_existing([mapping for _, mapping in chunk])
+        for (line, mapping), existing_id in zip(chunk, existing_ids):
+            if existing_id is not None:
+                if existing_id in seen:
+                    report['errors'].append({'row': line, 'error': "Duplicate row in file"})
+                    continue
+                seen.add(existing_id)
+                updates.append((line, dict(mapping, id=existing_id)))
+            else:
+                if model is Book:
+                    mapping.setdefault('status', 'Available')
+                inserts.append((line, mapping))
+
+        try:
+            self.session.bulk_insert_mappings(model, [mapping for _, mapping in inserts])
+            self.session.bulk_update_mappings(model, [mapping for _, mapping in updates])
+            self.session.commit()
+            report['inserted'] += len(inserts)
+            report['updated'] += len(updates)
+        except Exception:
+            self.session.rollback()
+            # Find the offending rows by writing the chunk one row at a time
+            for line, mapping in inserts + updates:
+                method = (self.session.bulk_update_mappings if 'id' in mapping
+                          else self.session.bulk_insert_mappings)
+                try:
+                    method(model, [mapping])
+                    self.session.commit()
+                    report['updated' if 'id' in mapping else 'inserted'] += 1
+                except Exception as e:
+                    self.session.rollback()
+                    report['errors'].append({'row': line, 'error': str(getattr(e, 'orig', e))})
+# frontend/screens/student_management.py
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
+                           QPushButton, QTableView, QComboBox, QLabel,
+                           QLineEdit, QFormLayout, QDialog)
+from PyQt6.QtCore import Qt
+from frontend.models.paged_table_model import PagedTableModel
+
+class StudentManagementScreen(QWidget):
+    def __init__(self, student_service):
+        super().__init__()
+        self.student_service = student_service
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        
+        # Filter section
+        filter_layout = QHBoxLayout()
+        self.class_combo = QComboBox()
+        self.class_combo.addItems([str(i) for i in range(1, 13)])
+        self.division_combo = QComboBox()
+        self.division_combo.addItems(['A', 'B', 'C', 'D'])
+
+        filter_layout.addWidget(QLabel("Class:"))
+        filter_layout.addWidget(self.class_combo)
+        filter_layout.addWidget(QLabel("Division:"))
+        filter_layout.addWidget(self.division_combo)
+        filter_layout.addStretch()
+
+        toolbar = QHBoxLayout()
+        add_button = QPushButton("Add Student")
+        add_button.clicked.connect(self.show_add_student_dialog)
+        toolbar.addWidget(add_button)
+        
+        # Student Table; rows are fetched page by page as the view scrolls
+        self.model = PagedTableModel([
+            "Roll No.", "Admission No.", "Name", 
+            "Class", "Division", "Contact", "Books Issued"
+        ], self.fetch_page, sort_column=0, parent=self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        # Enabling sorting sorts by the indicator, which loads the first page
+        self.table.horizontalHeader().setSortIndicator(0, Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        
+        layout.addLayout(filter_layout)
+        layout.addLayout(toolbar)
+        layout.addWidget(self.table)
+        
+        # Connect signals
+        self.class_combo.currentTextChanged.connect(self.refresh_student_list)
+        self.division_combo.currentTextChanged.connect(self.refresh_student_list)
+
+    def fetch_page(self, after, limit, sort_column, descending, filter_text):
+        return self.student_service.fetch_page(
+            self.class_combo.currentText(),
+            self.division_combo.currentText(),
+            after, limit, sort_column, descending, filter_text
+        )
+
+    def refresh_student_list(self):
+        self.model.refresh()
+
+    def show_add_student_dialog(self):
+        dialog = AddStudentDialog(self)
+        if dialog.exec():
+            self.refresh_student_list()
+
+class AddStudentDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Add New Student")
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QFormLayout(self)
+        
+        # Create input fields
+        self.admission_number = QLineEdit()
+        self.roll_number = QLineEdit()
+        self.first_name = QLineEdit()
+        self.last_name = QLineEdit()
+        self.class_combo = QComboBox()
+        self.class_combo.addItems([str(i) for i in range(1, 13)])
+        self.division_combo = QComboBox()
+        self.division_combo.addItems(['A', 'B', 'C', 'D'])
+        self.contact = QLineEdit()
+        self.parent_contact = QLineEdit()
+        self.email = QLineEdit()
+        
+        # Add fields to form
+        layout.addRow("Admission Number:", self.admission_number)
+        layout.addRow("Roll Number:", self.roll_number)
+        layout.addRow("First Name:", self.first_name)
+        layout.addRow("Last Name:", self.last_name)
+        layout.addRow("Class:", self.class_combo)
+        layout.addRow("Division:", self.division_combo)
+        layout.addRow("Contact:", self.contact)
+        layout.addRow("Parent Contact:", self.parent_contact)
+        layout.addRow("Email:", self.email)
+        
+        # Add buttons
+        button_box = QHBoxLayout()
+        save_button = QPushButton("Save")
+        cancel_button = QPushButton("Cancel")
+        
+        save_button.clicked.connect(self.save_student)
+        cancel_button.clicked.connect(self.reject)
+        
+        button_box.addWidget(save_button)
+        button_box.addWidget(cancel_button)
+        layout.addRow(button_box)
 
     def save_student(self):
         # Implementation to save student data
@@ -323,11 +2192,34 @@ class AddStudentDialog(QDialog):
 # frontend/screens/book_issue.py
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
                            QPushButton, QTableWidget, QTableWidgetItem,
-                           QLabel, QLineEdit)
+                           QLabel, QLineEdit, QFormLayout, QCompleter)
+from PyQt6.QtCore import QStringListModel, QThreadPool, QTimer
+from backend.services.lookup_index import barcode_index
+from frontend.widgets.service_task import ServiceTask
+
+STUDENT_SEARCH_DEBOUNCE_MS = 150
 
 class BookIssueScreen(QWidget):
-    def __init__(self):
+    """Issue desk: find a student, then scan books to issue to them.
+
+    Scanned codes are resolved with the shared barcode index, without a
+    query. Lookups and issues run on one worker thread, so student_resolver
+    and circulation_service need a database session that the GUI thread
+    does not use.
+    """
+
+    def __init__(self, student_resolver, circulation_service, index=barcode_index):
         super().__init__()
+        self.student_resolver = student_resolver
+        self.circulation_service = circulation_service
+        self.index = index
+        self.current_student = None
+        self._open_loans = 0
+        self._candidates = {}
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        # Results for text that has changed since are dropped
+        self._lookup_generation = 0
         self.init_ui()
 
     def init_ui(self):
@@ -336,11 +2228,26 @@ class BookIssueScreen(QWidget):
         # Student Search Section
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Enter Admission Number or Roll Number")
+        self.search_input.setPlaceholderText("Admission Number, Class-Roll (e.g. 10A-23) or Name")
         search_button = QPushButton("Search")
+        search_button.clicked.connect(self.search_student)
+        self.search_input.returnPressed.connect(self.search_student)
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(search_button)
         
+        # Suggestions once typing pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(STUDENT_SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.update_candidates)
+        self.search_input.textEdited.connect(lambda text: self.search_timer.start())
+        self.candidate_model = QStringListModel(self)
+        self.completer = QCompleter(self.candidate_model, self)
+        self.completer.setCompletionMode(
+            QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.activated.connect(self.select_candidate)
+        self.search_input.setCompleter(self.completer)
+        
         # Student Info Section
         self.student_info = QWidget()
         student_layout = QFormLayout(self.student_info)
@@ -357,8 +2264,12 @@ class BookIssueScreen(QWidget):
         self.book_input = QLineEdit()
         self.book_input.setPlaceholderText("Scan Book Barcode")
         issue_button = QPushButton("Issue Book")
+        issue_button.clicked.connect(self.issue_scanned_book)
+        self.book_input.returnPressed.connect(self.issue_scanned_book)
+        self.status_label = QLabel()
         issue_layout.addWidget(self.book_input)
         issue_layout.addWidget(issue_button)
+        issue_layout.addWidget(self.status_label)
         
         # Currently Issued Books Table
         self.issued_table = QTableWidget()
@@ -371,194 +2282,1798 @@ class BookIssueScreen(QWidget):
         layout.addWidget(self.student_info)
         layout.addLayout(issue_layout)
         layout.addWidget(self.issued_table)
+
+    def run_in_background(self, fn, *args, on_finished=None, on_failed=None):
+        task = ServiceTask(fn, *args)
+        if on_finished:
+            task.signals.finished.connect(on_finished)
+        if on_failed:
+            task.signals.failed.connect(on_failed)
+        self.thread_pool.start(task)
+
+    def _lookup(self, limit, on_finished):
+        self._lookup_generation += 1
+        generation = self._lookup_generation
+
+        def finished(candidates):
+            if generation == self._lookup_generation:
+                on_finished(candidates)
+
+        self.run_in_background(self.student_resolver.resolve,
+                               self.search_input.text(), limit,
+                               on_finished=finished)
+
+    def update_candidates(self):
+        self._lookup(10, self.show_candidates)
+
+    def show_candidates(self, candidates):
+        self._candidates = {
+            f"{row.first_name} {row.last_name or ''} - {row.class_name}{row.division}-{row.roll_number}"
+            f" ({row.admission_number})": row
+            for row in candidates
+        }
+        self.candidate_model.setStringList(list(self._candidates))
+        if candidates:
+            self.completer.complete()
+
+    def search_student(self):
+        self.search_timer.stop()
+        self._lookup(1, lambda candidates: candidates and self.show_student(candidates[0]))
+
+    def select_candidate(self, label):
+        row = self._candidates.get(label)
+        if row is not None:
+            self.show_student(row)
+
+    def show_student(self, row):
+        self.current_student = row
+        self._open_loans = row.open_loan_count
+        self.name_label.setText(f"{row.first_name} {row.last_name or ''}".strip())
+        self.class_label.setText(f"{row.class_name}-{row.division} (Roll {row.roll_number})")
+        self.books_issued_label.setText(str(self._open_loans))
+        self.issued_table.setRowCount(0)
+        self.status_label.setText("")
+
+    def issue_scanned_book(self):
+        code = self.book_input.text().strip()
+        if not code:
+            return
+        self.book_input.clear()
+        match = self.index.resolve(code)
+        if match is None:
+            self.status_label.setText(f"Unknown barcode: {code}")
+            return
+        kind, record_id = match
+        if kind == 'student':
+            # A student card scanned into the book field switches student
+            self.search_input.setText(code)
+            self.search_student()
+            return
+        if self.current_student is None:
+            self.status_label.setText("Find the student first")
+            return
+        self.status_label.setText("Issuing...")
+        self.run_in_background(
+            self._issue_book, self.current_student.id, record_id,
+            on_finished=self.book_issued,
+            on_failed=lambda error: self.status_label.setText(f"Error: {error}")
+        )
+
+    def _issue_book(self, student_id, book_id):
+        # Runs on the worker thread
+        transaction = self.circulation_service.issue_book(student_id, book_id)
+        return transaction.book.title, transaction.issue_date, transaction.due_date
+
+    def book_issued(self, result):
+        title, issue_date, due_date = result
+        row_number = self.issued_table.rowCount()
+        self.issued_table.insertRow(row_number)
+        for column, value in enumerate((title, str(issue_date), str(due_date))):
+            self.issued_table.setItem(row_number, column, QTableWidgetItem(value))
+        self._open_loans += 1
+        self.books_issued_label.setText(str(self._open_loans))
+        self.status_label.setText(f"Issued: {title}")
 # backend/services/report_service.py
+import csv
+import gzip
 from datetime import datetime
-import pandas as pd
+from sqlalchemy import func, select, union_all
+from ..models.book import Book
+from ..models.student import Student, BookTransaction
+from ..models.archive import BookTransactionArchive
+from ..models.rollup import ClassDailyStats, TitleDailyStats
+from ..instrumentation import instrument_methods
+
+TRANSACTION_EXPORT_COLUMNS = [
+    'Issue Date', 'Due Date', 'Return Date', 'Admission No', 'Roll No',
+    'Name', 'Class', 'Division', 'Barcode', 'ISBN', 'Title', 'Fine'
+]
+
+# The academic year runs June to May; terms start in June and November
+ACADEMIC_YEAR_START_MONTH = 6
+TERM_START_MONTHS = (6, 11)
+
+LOAN_COLUMNS = (
+    'id', 'book_id', 'student_id', 'issue_date', 'due_date', 'return_date',
+    'fine_amount'
+)
+
+def loan_history(include_archive=True):
+    """Live loans, and optionally archived ones, as one subquery named 'loans'"""
+    live = select(*[getattr(BookTransaction, name) for name in LOAN_COLUMNS])
+    if not include_archive:
+        return live.subquery('loans')
+    archived = select(*[
+        BookTransactionArchive.original_id.label('id') if name == 'id'
+        else getattr(BookTransactionArchive, name)
+        for name in LOAN_COLUMNS
+    ])
+    return union_all(live, archived).subquery('loans')
+
+def academic_year(day):
+    """e.g. '2024-25' for any day from June 2024 to May 2025"""
+    start = day.year if day.month >= ACADEMIC_YEAR_START_MONTH else day.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+def period_label(day, period):
+    if period == 'month':
+        return day.strftime('%Y-%m')
+    if period == 'year':
+        return academic_year(day)
+    offset = (day.month - ACADEMIC_YEAR_START_MONTH) % 12
+    term = sum(1 for month in TERM_START_MONTHS
+               if (month - ACADEMIC_YEAR_START_MONTH) % 12 <= offset)
+    return f"{academic_year(day)} Term {term}"
 
+@instrument_methods
 class ReportService:
     def __init__(self, db_session):
         self.session = db_session
 
     def generate_class_report(self, class_name, division):
-        # Query for class statistics
-        students = self.session.query(Student).filter_by(
-            class_name=class_name,
-            division=division
-        ).all()
-        
-        data = []
-        for student in students:
-            active_books = len([t for t in student.transactions 
-                              if t.return_date is None])
-            total_books = len(student.transactions)
-            
-            data.append({
-                'Roll No': student.roll_number,
-                'Name': f"{student.first_name} {student.last_name}",
-                'Books Currently Issued': active_books,
-                'Total Books Issued': total_books
-            })
-        
-        df = pd.DataFrame(data)
+        import pandas as pd
+
+        # Per-student loan counts over live and archived loans, aggregated
+        # in the database
+        loans = loan_history()
+        active_books = func.count(loans.c.id).filter(loans.c.return_date.is_(None))
+        total_books = func.count(loans.c.id)
+
+        rows = self.session.query(
+            Student.roll_number,
+            Student.first_name,
+            Student.last_name,
+            active_books.label('active_books'),
+            total_books.label('total_books')
+        ).outerjoin(
+            loans, loans.c.student_id == Student.id
+        ).filter(
+            Student.class_name == class_name,
+            Student.division == division
+        ).group_by(
+            Student.id
+        ).order_by(Student.roll_number).all()
+
+        data = [{
+            'Roll No': row.roll_number,
+            'Name': f"{row.first_name} {row.last_name}",
+            'Books Currently Issued': row.active_books,
+            'Total Books Issued': row.total_books
+        } for row in rows]
+
+        df = pd.DataFrame(data, columns=[
+            'Roll No', 'Name', 'Books Currently Issued', 'Total Books Issued'])
         return df
 
+    def generate_school_report(self):
+        """Per class/division statistics for the whole school in one query,
+        including archived loans
+        """
+        import pandas as pd
+
+        loans = loan_history()
+        rows = self.session.query(
+            Student.class_name,
+            Student.division,
+            func.count(func.distinct(Student.id)).label('students'),
+            func.count(loans.c.id).filter(
+                loans.c.return_date.is_(None)).label('active_books'),
+            func.count(loans.c.id).label('total_books')
+        ).outerjoin(
+            loans, loans.c.student_id == Student.id
+        ).group_by(
+            Student.class_name,
+            Student.division
+        ).all()
+
+        data = [{
+            'Class': row.class_name,
+            'Division': row.division,
+            'Students': row.students,
+            'Books Currently Issued': row.active_books,
+            'Total Books Issued': row.total_books
+        } for row in rows]
+
+        df = pd.DataFrame(data, columns=[
+            'Class', 'Division', 'Students',
+            'Books Currently Issued', 'Total Books Issued'])
+        # Order classes numerically ("2" before "10") where possible
+        order = pd.to_numeric(df['Class'], errors='coerce')
+        df = df.assign(_order=order).sort_values(
+            ['_order', 'Class', 'Division']).drop(columns='_order')
+        return df.reset_index(drop=True)
+
     def export_to_excel(self, class_name, division):
         df = self.generate_class_report(class_name, division)
         filename = f"Class_{class_name}_{division}_Report_{datetime.now().strftime('%Y%m%d')}.xlsx"
         df.to_excel(filename, index=False)
         return filename
+
+    def export_transactions(self, start_date=None, end_date=None, fmt='xlsx',
+                            filename=None, chunk_size=5000,
+                            progress_callback=None, include_archive=True):
+        """Stream book transactions to an xlsx, csv or csv.gz file.
+
+        Rows are read from a server-side cursor in chunks and written as they
+        arrive, so memory use does not grow with the number of rows.
+        Archived loans are included unless include_archive is False.
+        progress_callback, if given, is called as callback(rows_written, total)
+        after every chunk.
+        Returns: the filename written
+        """
+        if fmt not in ('xlsx', 'csv', 'csv.gz'):
+            raise ValueError(f"Unsupported export format: {fmt}")
+        if filename is None:
+            filename = f"Transactions_{datetime.now().strftime('%Y%m%d')}.{fmt}"
+
+        loans = loan_history(include_archive)
+        query = select(
+            loans.c.issue_date,
+            loans.c.due_date,
+            loans.c.return_date,
+            Student.admission_number,
+            Student.roll_number,
+            (Student.first_name + ' ' + func.coalesce(Student.last_name, '')).label('name'),
+            Student.class_name,
+            Student.division,
+            Book.barcode,
+            Book.isbn,
+            Book.title,
+            loans.c.fine_amount
+        ).select_from(loans).join(
+            Student, Student.id == loans.c.student_id
+        ).join(
+            Book, Book.id == loans.c.book_id
+        )
+        count_query = select(func.count(loans.c.id))
+        if start_date is not None:
+            query = query.where(loans.c.issue_date >= start_date)
+            count_query = count_query.where(loans.c.issue_date >= start_date)
+        if end_date is not None:
+            query = query.where(loans.c.issue_date <= end_date)
+            count_query = count_query.where(loans.c.issue_date <= end_date)
+        query = query.order_by(loans.c.issue_date, loans.c.id)
+
+        total = self.session.execute(count_query).scalar()
+        result = self.session.execute(
+            query.execution_options(stream_results=True, max_row_buffer=chunk_size))
+        chunks = result.partitions(chunk_size)
+
+        if fmt == 'xlsx':
+            self._write_xlsx(filename, chunks, total, progress_callback)
+        else:
+            opener = gzip.open if fmt == 'csv.gz' else open
+            with opener(filename, 'wt', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(TRANSACTION_EXPORT_COLUMNS)
+                written = 0
+                for chunk in chunks:
+                    writer.writerows(chunk)
+                    written += len(chunk)
+                    if progress_callback:
+                        progress_callback(written, total)
+        return filename
+
+    @staticmethod
+    def _write_xlsx(filename, chunks, total, progress_callback):
+        from openpyxl import Workbook
+
+        # A write-only workbook streams rows to disk instead of keeping cells
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Transactions")
+        sheet.append(TRANSACTION_EXPORT_COLUMNS)
+        written = 0
+        for chunk in chunks:
+            for row in chunk:
+                sheet.append(list(row))
+            written += len(chunk)
+            if progress_callback:
+                progress_callback(written, total)
+        workbook.save(filename)
+
+    def circulation_trends(self, period='month', class_name=None, division=None,
+                           start_date=None, end_date=None):
+        """Issues, returns and peak overdue loans per month, term or academic year.
+
+        Read from the daily rollup tables, so the cost depends on the number
+        of days covered rather than on the number of transactions.
+        """
+        import pandas as pd
+
+        if period not in ('month', 'term', 'year'):
+            raise ValueError(f"Unsupported trend period: {period}")
+
+        query = self.session.query(
+            ClassDailyStats.day,
+            func.sum(ClassDailyStats.issues).label('issues'),
+            func.sum(ClassDailyStats.returns).label('returns'),
+            func.sum(ClassDailyStats.overdues).label('overdues')
+        )
+        if class_name is not None:
+            query = query.filter(ClassDailyStats.class_name == class_name)
+        if division is not None:
+            query = query.filter(ClassDailyStats.division == division)
+        if start_date is not None:
+            query = query.filter(ClassDailyStats.day >= start_date)
+        if end_date is not None:
+            query = query.filter(ClassDailyStats.day <= end_date)
+        rows = query.group_by(ClassDailyStats.day).order_by(ClassDailyStats.day).all()
+
+        totals = {}
+        for row in rows:
+            label = period_label(row.day, period)
+            issues, returns, peak = totals.get(label, (0, 0, 0))
+            totals[label] = (issues + row.issues, returns + row.returns,
+                             max(peak, row.overdues))
+
+        return pd.DataFrame([
+            {'Period': label, 'Issues': issues, 'Returns': returns,
+             'Peak Overdue': peak}
+            for label, (issues, returns, peak) in totals.items()
+        ], columns=['Period', 'Issues', 'Returns', 'Peak Overdue'])
+
+    def popular_titles(self, start_date=None, end_date=None, limit=20):
+        """Most issued titles between two dates, from the daily title rollup"""
+        import pandas as pd
+
+        issues = func.sum(TitleDailyStats.issues)
+        query = self.session.query(TitleDailyStats.title, issues.label('issues'))
+        if start_date is not None:
+            query = query.filter(TitleDailyStats.day >= start_date)
+        if end_date is not None:
+            query = query.filter(TitleDailyStats.day <= end_date)
+        rows = query.group_by(TitleDailyStats.title).order_by(
+            issues.desc()).limit(limit).all()
+        return pd.DataFrame([{'Title': row.title, 'Issues': row.issues} for row in rows],
+                            columns=['Title', 'Issues'])
+
+    def export_school_report_to_excel(self):
+        df = self.generate_school_report()
+        filename = f"School_Report_{datetime.now().strftime('%Y%m%d')}.xlsx"
+        df.to_excel(filename, index=False)
+        return filename
 # backend/models/notification.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
+from .base import Base
 
-Base = declarative_base()
+class TeacherContact(Base):
+    __tablename__ = 'teacher_contacts'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    email = Column(String(100), nullable=False)
+    class_name = Column(String(10), nullable=False)
+    division = Column(String(2), nullable=False)
+    is_active = Column(Boolean, default=True)
+
+    __table_args__ = (
+        Index('ix_teacher_contacts_class_division', class_name, division, is_active),
+    )
+
+class Notification(Base):
+    __tablename__ = 'notifications'
+    
+    id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey('students.id'))
+    book_id = Column(Integer, ForeignKey('books.id'))
+    teacher_id = Column(Integer, ForeignKey('teacher_contacts.id'))
+    transaction_id = Column(Integer, ForeignKey('book_transactions.id'))
+    notification_type = Column(String(50))  # 'OVERDUE', 'REMINDER'
+    message = Column(String(500))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    is_sent = Column(Boolean, default=False)
+    # Outbox state: PENDING -> CLAIMED -> SENT, or DEAD after too many failures
+    status = Column(String(20), default='PENDING', server_default='PENDING', nullable=False)
+    attempts = Column(Integer, default=0, server_default='0', nullable=False)
+    claim_token = Column(String(32))
+    # End of the current claim's lease, or earliest retry of a failed send
+    claimed_until = Column(DateTime)
+    last_error = Column(String(500))
+    
+    student = relationship("Student")
+    book = relationship("Book")
+    teacher = relationship("TeacherContact")
+
+    __table_args__ = (
+        Index('ix_notifications_is_sent', is_sent),
+        # Outbox claims: claimable rows by status and lease
+        Index('ix_notifications_status_claimed_until', status, claimed_until),
+        Index('ix_notifications_claim_token', claim_token),
+        # Duplicate check in the overdue scan
+        Index('ix_notifications_transaction_type', transaction_id, notification_type),
+    )
+# backend/models/fine.py
+from sqlalchemy import Column, Integer, Date, DateTime
+from datetime import datetime
+from .base import Base
+
+class FineAccrualState(Base):
+    """Single row recording how far fines have been accrued"""
+    __tablename__ = 'fine_accrual_state'
+
+    id = Column(Integer, primary_key=True)
+    last_accrued_on = Column(Date)
+    loans_updated = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+# backend/models/rollup.py
+from sqlalchemy import Column, Integer, String, Date
+from .base import Base
+
+class ClassDailyStats(Base):
+    """Issues, returns and end-of-day overdue loans per class/division and day"""
+    __tablename__ = 'class_daily_stats'
+
+    day = Column(Date, primary_key=True)
+    class_name = Column(String(10), primary_key=True)
+    division = Column(String(2), primary_key=True)
+    issues = Column(Integer, default=0, nullable=False)
+    returns = Column(Integer, default=0, nullable=False)
+    overdues = Column(Integer, default=0, nullable=False)
+
+class TitleDailyStats(Base):
+    """Issues and returns per title and day"""
+    __tablename__ = 'title_daily_stats'
+
+    day = Column(Date, primary_key=True)
+    title = Column(String(200), primary_key=True)
+    issues = Column(Integer, default=0, nullable=False)
+    returns = Column(Integer, default=0, nullable=False)
+# backend/models/archive.py
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Index
+from datetime import datetime
+from .base import Base
+
+# Same columns as the live tables, without foreign keys so archived rows
+# never hold up changes to students, books or teachers. The live id is kept
+# in original_id: the live tables may hand out an archived id again, so it
+# cannot be the archive's primary key
+
+class BookTransactionArchive(Base):
+    __tablename__ = 'book_transactions_archive'
+
+    id = Column(Integer, primary_key=True)
+    original_id = Column(Integer, nullable=False)
+    book_id = Column(Integer)
+    student_id = Column(Integer)
+    issue_date = Column(Date, nullable=False)
+    due_date = Column(Date, nullable=False)
+    return_date = Column(Date)
+    fine_amount = Column(Integer, default=0)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_book_transactions_archive_original_id', original_id),
+        Index('ix_book_transactions_archive_student', student_id),
+        Index('ix_book_transactions_archive_issue_date', issue_date),
+    )
+
+class NotificationArchive(Base):
+    __tablename__ = 'notifications_archive'
+
+    id = Column(Integer, primary_key=True)
+    original_id = Column(Integer, nullable=False)
+    student_id = Column(Integer)
+    book_id = Column(Integer)
+    teacher_id = Column(Integer)
+    transaction_id = Column(Integer)
+    notification_type = Column(String(50))
+    message = Column(String(500))
+    created_at = Column(DateTime)
+    sent_at = Column(DateTime)
+    is_sent = Column(Boolean, default=False)
+    status = Column(String(20))
+    attempts = Column(Integer, default=0)
+    last_error = Column(String(500))
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_notifications_archive_original_id', original_id),
+        Index('ix_notifications_archive_transaction', transaction_id),
+    )
+# backend/models/job.py
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from datetime import datetime
+from .base import Base
+
+class JobLock(Base):
+    """Lease held by the process running a scheduled job"""
+    __tablename__ = 'job_locks'
+
+    job_id = Column(String(50), primary_key=True)
+    owner = Column(String(100))
+    locked_until = Column(DateTime)
+    acquired_at = Column(DateTime)
+
+class JobHistory(Base):
+    __tablename__ = 'job_history'
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(50), nullable=False)
+    trigger = Column(String(20))    # 'scheduled', 'catch-up', 'manual'
+    status = Column(String(20))     # 'SUCCESS', 'FAILED', 'LOCKED'
+    started_at = Column(DateTime, default=datetime.utcnow)
+    duration_seconds = Column(Float)
+    rows = Column(Integer)
+    error = Column(String(500))
+
+    __table_args__ = (
+        Index('ix_job_history_job_started', job_id, started_at),
+    )
+# backend/migrations/add_hot_indexes.py
+from datetime import datetime
+from sqlalchemy import inspect, text
+from ..models.notification import Notification, TeacherContact
+from ..models.student import Student, BookTransaction
+
+HOT_TABLES = [
+    Student.__table__,
+    BookTransaction.__table__,
+    Notification.__table__,
+    TeacherContact.__table__,
+]
+
+# Indexes added by this migration; later migrations add their own
+HOT_INDEXES = (
+    'ix_students_class_division_roll',
+    'ix_book_transactions_open_due',
+    'ix_book_transactions_student_return',
+    'ix_notifications_is_sent',
+    'ix_notifications_transaction_type',
+    'ix_teacher_contacts_class_division',
+)
+
+# The queries the services run most often, with sample parameters
+HOT_QUERIES = {
+    'overdue_scan': (
+        "SELECT id FROM book_transactions "
+        "WHERE due_date < :today AND return_date IS NULL",
+        {'today': datetime.now().date()}
+    ),
+    'class_roster': (
+        "SELECT id FROM students "
+        "WHERE class_name = :class_name AND division = :division "
+        "AND is_active = :is_active ORDER BY roll_number",
+        {'class_name': '10', 'division': 'A', 'is_active': True}
+    ),
+    'pending_notifications': (
+        "SELECT id FROM notifications "
+        "WHERE status IN ('PENDING', 'CLAIMED') "
+        "AND (claimed_until IS NULL OR claimed_until < :now) ORDER BY id",
+        {'now': datetime.utcnow()}
+    ),
+    'teacher_for_class': (
+        "SELECT id FROM teacher_contacts "
+        "WHERE class_name = :class_name AND division = :division "
+        "AND is_active = :is_active",
+        {'class_name': '10', 'division': 'A', 'is_active': True}
+    ),
+}
+
+def upgrade(engine):
+    """Add the hot-query indexes (and the columns they need) to an existing database.
+    Returns: list of index names that were created
+    """
+    # Notification.transaction_id was added after the first release
+    columns = {column['name'] for column in inspect(engine).get_columns('notifications')}
+    if 'transaction_id' not in columns:
+        with engine.begin() as conn:
+            conn.execute(text(
+                "ALTER TABLE notifications ADD COLUMN transaction_id INTEGER "
+                "REFERENCES book_transactions(id)"))
+    # Link existing notifications to their open loan so the overdue scan's
+    # duplicate check recognises them
+    with engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE notifications SET transaction_id = ("
+            "SELECT MAX(book_transactions.id) FROM book_transactions "
+            "WHERE book_transactions.student_id = notifications.student_id "
+            "AND book_transactions.book_id = notifications.book_id "
+            "AND book_transactions.return_date IS NULL"
+            ") WHERE transaction_id IS NULL"))
+
+    created = []
+    for table in HOT_TABLES:
+        existing = {index['name'] for index in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in HOT_INDEXES and index.name not in existing:
+                index.create(bind=engine)
+                created.append(index.name)
+    return created
+
+def explain_hot_queries(engine):
+    """Run EXPLAIN for each hot query.
+    Returns: dict of query name -> {'plan': [lines], 'indexes': [index names used]}
+    """
+    prefix = 'EXPLAIN QUERY PLAN' if engine.dialect.name == 'sqlite' else 'EXPLAIN'
+    index_names = [index.name for table in HOT_TABLES for index in table.indexes]
+
+    report = {}
+    with engine.connect() as conn:
+        for name, (sql, params) in HOT_QUERIES.items():
+            rows = conn.execute(text(f"{prefix} {sql}"), params).fetchall()
+            plan = [" | ".join(str(value) for value in row) for row in rows]
+            report[name] = {
+                'plan': plan,
+                'indexes': [index for index in index_names
+                            if any(index in line for line in plan)]
+            }
+    return report
+# backend/migrations/add_loan_counters.py
+from sqlalchemy import inspect, text
+from ..services.circulation_service import CirculationService
+
+def upgrade(engine, db_session):
+    """Add Student.open_loan_count to an existing database and fill it in.
+    Returns: the counts repaired by CirculationService.reconcile_counters
+    """
+    columns = {column['name'] for column in inspect(engine).get_columns('students')}
+    if 'open_loan_count' not in columns:
+        with engine.begin() as conn:
+            conn.execute(text(
+                "ALTER TABLE students ADD COLUMN open_loan_count INTEGER "
+                "NOT NULL DEFAULT 0"))
+    return CirculationService(db_session).reconcile_counters()
+# backend/migrations/add_notification_outbox.py
+from sqlalchemy import inspect, text
+from ..models.notification import Notification
+
+OUTBOX_COLUMNS = {
+    'status': "VARCHAR(20) NOT NULL DEFAULT 'PENDING'",
+    'attempts': "INTEGER NOT NULL DEFAULT 0",
+    'claim_token': "VARCHAR(32)",
+    'claimed_until': "TIMESTAMP",
+    'last_error': "VARCHAR(500)",
+}
+
+OUTBOX_INDEXES = (
+    'ix_notifications_status_claimed_until',
+    'ix_notifications_claim_token',
+)
+
+def upgrade(engine):
+    """Add the outbox columns and indexes to an existing notifications table.
+    Returns: list of columns that were added
+    """
+    existing = {column['name'] for column in inspect(engine).get_columns('notifications')}
+    added = [name for name in OUTBOX_COLUMNS if name not in existing]
+    with engine.begin() as conn:
+        for name in added:
+            conn.execute(text(
+                f"ALTER TABLE notifications ADD COLUMN {name} {OUTBOX_COLUMNS[name]}"))
+        if 'status' in added:
+            conn.execute(text(
+                "UPDATE notifications SET status = 'SENT' WHERE is_sent = :sent"),
+                {'sent': True})
+
+    indexes = {index['name'] for index in inspect(engine).get_indexes('notifications')}
+    for index in Notification.__table__.indexes:
+        if index.name in OUTBOX_INDEXES and index.name not in indexes:
+            index.create(bind=engine)
+    return added
+# backend/migrations/add_circulation_rollups.py
+from ..models.rollup import ClassDailyStats, TitleDailyStats
+from ..services.rollup_service import RollupService
+
+def upgrade(engine, db_session):
+    """Create the rollup tables and fill them from the transaction history.
+    Returns: the row counts written by RollupService.rebuild
+    """
+    ClassDailyStats.__table__.create(engine, checkfirst=True)
+    TitleDailyStats.__table__.create(engine, checkfirst=True)
+    return RollupService(db_session).rebuild()
+# backend/services/cache.py
+import threading
+import time
+from collections import OrderedDict
+from ..instrumentation import metrics
+
+class TTLCache:
+    """Thread-safe read-through cache with a size bound, LRU eviction and a TTL.
+
+    Entries expire after `ttl` seconds so changes made by other processes
+    show up eventually; writes in this process should invalidate explicitly.
+    """
+
+    def __init__(self, name, maxsize=128, ttl=300):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.increment('cache_requests_total', cache=self.name, result='hit')
+                return entry[1]
+            self.misses += 1
+        metrics.increment('cache_requests_total', cache=self.name, result='miss')
+
+        # Load outside the lock so a slow query does not block other keys
+        value = loader()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'hit_rate': self.hits / requests if requests else 0.0
+            }
+
+# Active class teacher per (class_name, division), cached as one map
+teacher_cache = TTLCache('teachers', maxsize=1, ttl=600)
+# Active students of a class, keyed by (class_name, division)
+roster_cache = TTLCache('rosters', maxsize=64, ttl=300)
+
+def cache_stats():
+    return {cache.name: cache.stats() for cache in (teacher_cache, roster_cache)}
+# backend/services/teacher_service.py
+from ..models.notification import TeacherContact
+from ..instrumentation import instrument_methods
+from .cache import teacher_cache
+
+@instrument_methods
+class TeacherService:
+    def __init__(self, db_session):
+        self.session = db_session
+
+    def get_teacher_map(self):
+        """Returns: dict of (class_name, division) -> id of the class's active teacher"""
+        return teacher_cache.get_or_load('all', self._load_teacher_map)
+
+    def _load_teacher_map(self):
+        teachers = {}
+        for teacher_id, class_name, division in self.session.query(
+                TeacherContact.id, TeacherContact.class_name, TeacherContact.division
+        ).filter(TeacherContact.is_active.is_(True)).order_by(TeacherContact.id):
+            # The first active teacher of a class gets its notifications
+            teachers.setdefault((class_name, division), teacher_id)
+        return teachers
+
+    def add_teacher(self, teacher_data):
+        teacher = TeacherContact(
+            name=teacher_data['name'],
+            email=teacher_data['email'],
+            class_name=teacher_data['class_name'],
+            division=teacher_data['division']
+        )
+        self.session.add(teacher)
+        self.session.commit()
+        teacher_cache.clear()
+        return teacher
+
+    def update_teacher(self, teacher_id, teacher_data):
+        teacher = self.session.query(TeacherContact).get(teacher_id)
+        for field in ('name', 'email', 'class_name', 'division', 'is_active'):
+            if field in teacher_data:
+                setattr(teacher, field, teacher_data[field])
+        self.session.commit()
+        teacher_cache.clear()
+        return teacher
+
+    def deactivate_teacher(self, teacher_id):
+        return self.update_teacher(teacher_id, {'is_active': False})
+# backend/services/fine_service.py
+import os
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, update
+from ..models.fine import FineAccrualState
+from ..models.student import BookTransaction
+from ..instrumentation import instrument_methods
+
+def parse_holidays(value):
+    """Comma-separated ISO dates, e.g. '2024-08-15,2024-10-02'"""
+    return {date.fromisoformat(item.strip()) for item in (value or '').split(',')
+            if item.strip()}
+
+@instrument_methods
+class FineEngine:
+    """Accrue overdue fines with set-based updates.
+
+    A loan's fine depends only on its due date, so open loans are grouped by
+    due date and every group owing the same amount is updated with one
+    UPDATE over a due-date range. Loans already at that amount (including
+    those at the cap) are not touched.
+    """
+
+    def __init__(self, db_session, rate_per_day=None, grace_days=None, cap=None,
+                 skip_weekends=None, holidays=None):
+        self.session = db_session
+        self.rate_per_day = rate_per_day if rate_per_day is not None else int(
+            os.getenv('FINE_RATE_PER_DAY', '1'))
+        self.grace_days = grace_days if grace_days is not None else int(
+            os.getenv('FINE_GRACE_DAYS', '0'))
+        self.cap = cap if cap is not None else int(os.getenv('FINE_CAP', '0')) or None
+        self.skip_weekends = skip_weekends if skip_weekends is not None else (
+            os.getenv('FINE_SKIP_WEEKENDS', 'false').lower() == 'true')
+        self.holidays = holidays if holidays is not None else parse_holidays(
+            os.getenv('FINE_HOLIDAYS'))
+
+    def is_chargeable(self, day):
+        if self.skip_weekends and day.weekday() >= 5:
+            return False
+        return day not in self.holidays
+
+    def chargeable_days(self, due_date, as_of):
+        """Chargeable days after the grace period, up to and including as_of"""
+        day = due_date + timedelta(days=self.grace_days + 1)
+        days = 0
+        while day <= as_of:
+            days += self.is_chargeable(day)
+            day += timedelta(days=1)
+        return days
+
+    def fine_for(self, due_date, as_of):
+        fine = self.chargeable_days(due_date, as_of) * self.rate_per_day
+        return min(fine, self.cap) if self.cap is not None else fine
+
+    def fine_bands(self, due_dates, as_of):
+        """Group due dates into contiguous ranges owing the same fine.
+        Returns: list of (fine, earliest due date, latest due date)
+        """
+        if not due_dates:
+            return []
+        due_dates = sorted(due_dates)
+        first = due_dates[0] + timedelta(days=self.grace_days + 1)
+
+        # Running count of chargeable days from the earliest start, so each
+        # due date costs one lookup instead of a walk to as_of
+        running = {}
+        count = 0
+        day = first
+        while day <= as_of:
+            count += self.is_chargeable(day)
+            running[day] = count
+            day += timedelta(days=1)
+
+        bands = []
+        for due_date in due_dates:
+            start = due_date + timedelta(days=self.grace_days)
+            days = count - running.get(start, 0)
+            fine = days * self.rate_per_day
+            if self.cap is not None:
+                fine = min(fine, self.cap)
+            if bands and bands[-1][0] == fine:
+                bands[-1][2] = due_date
+            else:
+                bands.append([fine, due_date, due_date])
+        return [tuple(band) for band in bands]
+
+    def accrue(self, as_of=None, force=False):
+        """Bring fines on every open overdue loan up to as_of.
+
+        Skipped when fines were already accrued for as_of, unless forced.
+        Catching up after missed nights needs no replay: amounts are
+        recomputed from the due date.
+        Returns: dict with 'bands', 'updated' and 'skipped'
+        """
+        as_of = as_of or datetime.now().date()
+        state = self.session.query(FineAccrualState).order_by(
+            FineAccrualState.id).first()
+        if state is None:
+            state = FineAccrualState()
+            self.session.add(state)
+        elif not force and state.last_accrued_on is not None \
+                and state.last_accrued_on >= as_of:
+            return {'bands': 0, 'updated': 0, 'skipped': True}
+
+        last_free_due_date = as_of - timedelta(days=self.grace_days + 1)
+        due_dates = [row.due_date for row in self.session.query(
+            BookTransaction.due_date
+        ).filter(
+            BookTransaction.return_date.is_(None),
+            BookTransaction.due_date <= last_free_due_date
+        ).distinct()]
+
+        bands = self.fine_bands(due_dates, as_of)
+        updated = 0
+        try:
+            for fine, earliest, latest in bands:
+                updated += self.session.execute(
+                    update(BookTransaction).where(
+                        BookTransaction.return_date.is_(None),
+                        BookTransaction.due_date.between(earliest, latest),
+                        func.coalesce(BookTransaction.fine_amount, 0) != fine
+                    ).values(fine_amount=fine).execution_options(
+                        synchronize_session=False)
+                ).rowcount
+            state.last_accrued_on = as_of
+            state.loans_updated = updated
+            state.updated_at = datetime.utcnow()
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+        return {'bands': len(bands), 'updated': updated, 'skipped': False}
+# backend/services/archive_service.py
+import os
+from datetime import datetime
+from sqlalchemy import delete, exists, insert, select
+from ..models.student import BookTransaction
+from ..models.notification import Notification
+from ..models.archive import BookTransactionArchive, NotificationArchive
+from ..instrumentation import instrument_methods
+
+ARCHIVED_TRANSACTION_COLUMNS = [
+    'id', 'book_id', 'student_id', 'issue_date', 'due_date', 'return_date',
+    'fine_amount'
+]
+ARCHIVED_NOTIFICATION_COLUMNS = [
+    'id', 'student_id', 'book_id', 'teacher_id', 'transaction_id',
+    'notification_type', 'message', 'created_at', 'sent_at', 'is_sent',
+    'status', 'attempts', 'last_error'
+]
+
+def months_before(moment, months):
+    """The same day and time `months` calendar months earlier, clamped to month end"""
+    month_index = moment.year * 12 + moment.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    next_month = datetime(year + month // 12, month % 12 + 1, 1)
+    last_day = (next_month - datetime(year, month, 1)).days
+    return moment.replace(year=year, month=month, day=min(moment.day, last_day))
+
+def archive_column(name):
+    """The archive column a live column is copied to"""
+    return 'original_id' if name == 'id' else name
+
+@instrument_methods
+class ArchiveService:
+    """Move finished loans and notifications out of the live tables.
+
+    Rows are copied with INSERT ... SELECT and deleted in chunks of
+    `chunk_size` ids, one transaction per chunk, so a run never holds long
+    locks. Notifications go first; a loan is only archived once no live
+    notification refers to it.
+    """
+
+    def __init__(self, db_session, months=None, chunk_size=None):
+        self.session = db_session
+        self.months = months or int(os.getenv('ARCHIVE_AFTER_MONTHS', '12'))
+        self.chunk_size = chunk_size or int(os.getenv('ARCHIVE_CHUNK_SIZE', '5000'))
+
+    def _move(self, model, archive_model, columns, conditions):
+        moved = 0
+        while True:
+            ids = [row[0] for row in self.session.execute(
+                select(model.id).where(*conditions).order_by(model.id).limit(
+                    self.chunk_size))]
+            if not ids:
+                return moved
+            try:
+                self.session.execute(
+                    insert(archive_model).from_select(
+                        [archive_column(name) for name in columns],
+                        select(*[getattr(model, name) for name in columns]).where(
+                            model.id.in_(ids))
+                    )
+                )
+                self.session.execute(
+                    delete(model).where(model.id.in_(ids)).execution_options(
+                        synchronize_session=False)
+                )
+                self.session.commit()
+            except Exception:
+                self.session.rollback()
+                raise
+            moved += len(ids)
+
+    def archive(self, now=None):
+        """Archive notifications and returned loans older than the cutoff.
+        Returns: dict with the number of 'notifications' and 'transactions' moved
+        """
+        cutoff = months_before(now or datetime.now(), self.months)
+        open_loan = exists().where(
+            BookTransaction.id == Notification.transaction_id,
+            BookTransaction.return_date.is_(None)
+        )
+        # Notifications of loans that are still open stay live: the overdue
+        # scan uses them to avoid notifying twice
+        notifications = self._move(
+            Notification, NotificationArchive, ARCHIVED_NOTIFICATION_COLUMNS, [
+                Notification.status.in_(('SENT', 'DEAD')),
+                Notification.created_at < cutoff,
+                ~open_loan
+            ])
+
+        live_notification = exists().where(
+            Notification.transaction_id == BookTransaction.id)
+        transactions = self._move(
+            BookTransaction, BookTransactionArchive, ARCHIVED_TRANSACTION_COLUMNS, [
+                BookTransaction.return_date.isnot(None),
+                BookTransaction.return_date < cutoff.date(),
+                ~live_notification
+            ])
+        return {'notifications': notifications, 'transactions': transactions}
+# backend/services/email_delivery.py
+import logging
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ..instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+class SMTPConnectionPool:
+    """A small pool of long-lived, authenticated SMTP connections"""
+
+    def __init__(self, server, port, username=None, password=None,
+                 use_tls=True, size=2, timeout=30):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        connection = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        if self.use_tls:
+            connection.starttls()
+        if self.username:
+            connection.login(self.username, self.password)
+        return connection
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                return self._connect()
+            except Exception:
+                self._slots.release()
+                raise
+
+    def release(self, connection):
+        self._idle.put_nowait(connection)
+        self._slots.release()
+
+    def discard(self, connection):
+        """Drop a broken connection; the next acquire opens a fresh one"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                connection.quit()
+            except Exception:
+                connection.close()
+
+class RateLimiter:
+    """Token bucket shared by all sender threads"""
+
+    def __init__(self, rate_per_second):
+        self.rate = rate_per_second
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+class EmailDeliveryEngine:
+    """Sends messages in parallel over pooled SMTP connections.
+
+    Temporary failures (4xx replies, dropped connections) are retried with
+    exponential backoff on a fresh connection; permanent failures are not.
+    """
+
+    def __init__(self, pool, workers=4, rate_limit=None, max_retries=3,
+                 backoff=1.0):
+        self.pool = pool
+        self.workers = workers
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def send(self, message):
+        """Send one message. Returns: True on success, False otherwise"""
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            connection = None
+            started = time.perf_counter()
+            try:
+                connection = self.pool.acquire()
+                connection.send_message(message)
+                self.pool.release(connection)
+                metrics.observe('smtp_send_seconds', time.perf_counter() - started)
+                metrics.increment('smtp_messages_total', result='sent')
+                return True
+            except smtplib.SMTPRecipientsRefused as e:
+                self.pool.release(connection)
+                logger.error(f"Failed to send email to {message['To']}: {e}")
+                metrics.increment('smtp_messages_total', result='failed')
+                return False
+            except smtplib.SMTPResponseException as e:
+                # The connection is still usable after an SMTP error reply
+                if connection is not None:
+                    self.pool.release(connection)
+                if not 400 <= e.smtp_code < 500:
+                    logger.error(f"Failed to send email to {message['To']}: {e}")
+                    metrics.increment('smtp_messages_total', result='failed')
+                    return False
+            except OSError:
+                # Dropped or refused connection, reconnect on the next attempt
+                if connection is not None:
+                    self.pool.discard(connection)
+            except Exception as e:
+                if connection is not None:
+                    self.pool.discard(connection)
+                logger.error(f"Failed to send email to {message['To']}: {e}")
+                metrics.increment('smtp_messages_total', result='failed')
+                return False
+
+            if attempt < self.max_retries:
+                metrics.increment('smtp_messages_total', result='retried')
+                time.sleep(self.backoff * (2 ** attempt))
+
+        logger.error(f"Failed to send email to {message['To']} "
+                     f"after {self.max_retries + 1} attempts")
+        metrics.increment('smtp_messages_total', result='failed')
+        return False
+
+    def send_many(self, messages):
+        """Send (key, message) pairs in parallel.
+
+        Returns: dict with the keys that were 'sent', those that 'failed',
+        and the 'elapsed' seconds and 'messages_per_second' of the run
+        """
+        started = time.monotonic()
+        sent, failed = [], []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [(key, executor.submit(self.send, message))
+                       for key, message in messages]
+            for key, future in futures:
+                (sent if future.result() else failed).append(key)
 
-class TeacherContact(Base):
-    __tablename__ = 'teacher_contacts'
-    
-    id = Column(Integer, primary_key=True)
-    name = Column(String(100), nullable=False)
-    email = Column(String(100), nullable=False)
-    class_name = Column(String(10), nullable=False)
-    division = Column(String(2), nullable=False)
-    is_active = Column(Boolean, default=True)
+        elapsed = time.monotonic() - started
+        return {
+            'sent': sent,
+            'failed': failed,
+            'elapsed': elapsed,
+            'messages_per_second': len(sent) / elapsed if elapsed else 0.0
+        }
 
-class Notification(Base):
-    __tablename__ = 'notifications'
-    
-    id = Column(Integer, primary_key=True)
-    student_id = Column(Integer, ForeignKey('students.id'))
-    book_id = Column(Integer, ForeignKey('books.id'))
-    teacher_id = Column(Integer, ForeignKey('teacher_contacts.id'))
-    notification_type = Column(String(50))  # 'OVERDUE', 'REMINDER'
-    message = Column(String(500))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    sent_at = Column(DateTime, nullable=True)
-    is_sent = Column(Boolean, default=False)
-    
-    student = relationship("Student")
-    book = relationship("Book")
-    teacher = relationship("TeacherContact")
+    def close(self):
+        self.pool.close()
 # backend/services/notification_service.py
 from datetime import datetime, timedelta
-import smtplib
+from html import escape
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import logging
 import os
-from sqlalchemy import and_
+import uuid
+from sqlalchemy import and_, case, or_, select, true, update
+from sqlalchemy.orm import joinedload
+from ..models.book import Book
 from ..models.notification import Notification, TeacherContact
-from ..models.student import BookTransaction
+from ..models.student import Student, BookTransaction
+from .email_delivery import EmailDeliveryEngine, SMTPConnectionPool
+from .teacher_service import TeacherService
+from ..instrumentation import instrument_methods
 
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_STATUS_LABELS = {
+    'PENDING': "Pending",
+    'CLAIMED': "Sending",
+    'SENT': "Sent",
+    'DEAD': "Failed",
+}
+
+@instrument_methods
 class NotificationService:
-    def __init__(self, db_session):
+    def __init__(self, db_session, delivery_engine=None):
         self.session = db_session
         self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
         self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
         self.smtp_username = os.getenv('SMTP_USERNAME')
         self.smtp_password = os.getenv('SMTP_PASSWORD')
         self.from_email = os.getenv('FROM_EMAIL')
+        self.smtp_use_tls = os.getenv('SMTP_USE_TLS', 'true').lower() != 'false'
+        self.smtp_pool_size = int(os.getenv('SMTP_POOL_SIZE', '2'))
+        self.smtp_workers = int(os.getenv('SMTP_WORKERS', '4'))
+        self.smtp_rate_limit = float(os.getenv('SMTP_RATE_LIMIT', '0')) or None
+        self.smtp_max_retries = int(os.getenv('SMTP_MAX_RETRIES', '3'))
+        # Digest mode sends one email per teacher instead of one per book
+        self.digest_mode = os.getenv('NOTIFICATION_DIGEST', 'false').lower() == 'true'
+        # Outbox settings
+        self.batch_size = int(os.getenv('NOTIFICATION_BATCH_SIZE', '100'))
+        self.lease_seconds = int(os.getenv('NOTIFICATION_LEASE_SECONDS', '600'))
+        self.max_attempts = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', '5'))
+        self.retry_delay = int(os.getenv('NOTIFICATION_RETRY_DELAY', '300'))
+        self._delivery_engine = delivery_engine
+
+    @property
+    def delivery_engine(self):
+        """Delivery engine with pooled SMTP connections, created on first use"""
+        if self._delivery_engine is None:
+            pool = SMTPConnectionPool(
+                self.smtp_server,
+                self.smtp_port,
+                username=self.smtp_username,
+                password=self.smtp_password,
+                use_tls=self.smtp_use_tls,
+                size=self.smtp_pool_size
+            )
+            self._delivery_engine = EmailDeliveryEngine(
+                pool,
+                workers=self.smtp_workers,
+                rate_limit=self.smtp_rate_limit,
+                max_retries=self.smtp_max_retries
+            )
+        return self._delivery_engine
 
     def check_overdue_books(self):
-        """Check for overdue books and create notifications"""
+        """Check for overdue books and create notifications.
+
+        Runs as one joined query over open overdue loans, skips loans that
+        already have an overdue notification (sent or not) and inserts the
+        new ones in a single bulk insert.
+        Returns: dict with 'scanned', 'created' and 'skipped' counts
+        """
         today = datetime.now().date()
-        
-        # Find overdue transactions
-        overdue_transactions = self.session.query(BookTransaction).filter(
+
+        # Loans that already have an overdue notification
+        already_notified = self.session.query(Notification.id).filter(
+            Notification.transaction_id == BookTransaction.id,
+            Notification.notification_type == 'OVERDUE'
+        ).exists()
+
+        teachers = TeacherService(self.session).get_teacher_map()
+
+        # Find overdue transactions with their student and book
+        overdue_rows = self.session.query(
+            BookTransaction.id.label('transaction_id'),
+            BookTransaction.book_id,
+            BookTransaction.due_date,
+            Student.id.label('student_id'),
+            Student.first_name,
+            Student.last_name,
+            Student.class_name,
+            Student.division,
+            Student.roll_number,
+            Book.title,
+            already_notified.label('already_notified')
+        ).join(
+            Student, Student.id == BookTransaction.student_id
+        ).join(
+            Book, Book.id == BookTransaction.book_id
+        ).filter(
             and_(
                 BookTransaction.due_date < today,
                 BookTransaction.return_date.is_(None)
             )
         ).all()
 
-        for transaction in overdue_transactions:
-            # Get teacher contact for the student's class
-            teacher = self.session.query(TeacherContact).filter_by(
-                class_name=transaction.student.class_name,
-                division=transaction.student.division,
-                is_active=True
-            ).first()
+        new_notifications = []
+        for row in overdue_rows:
+            teacher_id = teachers.get((row.class_name, row.division))
+            if teacher_id is None or row.already_notified:
+                continue
 
-            if teacher:
-                # Create notification
-                message = self._create_overdue_message(transaction)
-                notification = Notification(
-                    student_id=transaction.student.id,
-                    book_id=transaction.book_id,
-                    teacher_id=teacher.id,
-                    notification_type='OVERDUE',
-                    message=message
-                )
-                self.session.add(notification)
-        
+            new_notifications.append({
+                'student_id': row.student_id,
+                'book_id': row.book_id,
+                'teacher_id': teacher_id,
+                'transaction_id': row.transaction_id,
+                'notification_type': 'OVERDUE',
+                'message': self._create_overdue_message(row, today)
+            })
+
+        if new_notifications:
+            self.session.bulk_insert_mappings(Notification, new_notifications)
         self.session.commit()
 
-    def send_pending_notifications(self):
-        """Send all pending notifications"""
-        pending_notifications = self.session.query(Notification).filter_by(
-            is_sent=False
-        ).all()
+        return {
+            'scanned': len(overdue_rows),
+            'created': len(new_notifications),
+            'skipped': len(overdue_rows) - len(new_notifications)
+        }
+
+    def claim_batch(self, limit=None, extra_condition=None):
+        """Claim up to `limit` claimable notifications for this sender.
 
-        for notification in pending_notifications:
-            if self._send_email_notification(notification):
-                notification.sent_at = datetime.utcnow()
-                notification.is_sent = True
+        A claim is a lease: rows whose lease ran out (a crashed sender) or
+        whose retry time has passed can be claimed again. On PostgreSQL and
+        MySQL rows are picked with SELECT ... FOR UPDATE SKIP LOCKED; on
+        SQLite a single UPDATE flips them atomically.
+        Returns: (claim token, number of rows claimed)
+        """
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        claimable = and_(
+            Notification.status.in_(('PENDING', 'CLAIMED')),
+            or_(Notification.claimed_until.is_(None),
+                Notification.claimed_until < now)
+        )
+        if extra_condition is not None:
+            claimable = and_(claimable, extra_condition)
+        candidates = select(Notification.id).where(claimable).order_by(
+            Notification.id).limit(limit or self.batch_size)
+
+        if self.session.get_bind().dialect.name == 'sqlite':
+            id_filter = Notification.id.in_(candidates.scalar_subquery())
+        else:
+            ids = self.session.execute(
+                candidates.with_for_update(skip_locked=True)).scalars().all()
+            id_filter = Notification.id.in_(ids)
+
+        claimed = self.session.execute(
+            update(Notification).where(id_filter, claimable).values(
+                status='CLAIMED',
+                claim_token=token,
+                claimed_until=now + timedelta(seconds=self.lease_seconds)
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        # Commit right away so the claim is visible to other senders
+        self.session.commit()
+        return token, claimed
 
+    def _complete_claim(self, token, sent_condition, failed_condition, error):
+        """Mark claimed rows sent, and put failed ones back for a later retry or dead-letter them"""
+        now = datetime.utcnow()
+        sent = 0
+        if sent_condition is not None:
+            sent = self.session.execute(
+                update(Notification).where(
+                    Notification.claim_token == token, sent_condition
+                ).values(
+                    status='SENT',
+                    is_sent=True,
+                    sent_at=now,
+                    claim_token=None,
+                    claimed_until=None,
+                    attempts=Notification.attempts + 1
+                ).execution_options(synchronize_session=False)
+            ).rowcount
+        if failed_condition is not None:
+            self.session.execute(
+                update(Notification).where(
+                    Notification.claim_token == token, failed_condition
+                ).values(
+                    status=case(
+                        (Notification.attempts + 1 >= self.max_attempts, 'DEAD'),
+                        else_='PENDING'
+                    ),
+                    claim_token=None,
+                    claimed_until=now + timedelta(seconds=self.retry_delay),
+                    attempts=Notification.attempts + 1,
+                    last_error=error
+                ).execution_options(synchronize_session=False)
+            )
         self.session.commit()
+        return sent
+
+    def send_pending_notifications(self, deadline=None):
+        """Send all pending notifications, one claimed batch at a time.
+
+        Several senders can run at once: each only sends the rows it has
+        claimed. Messages are sent in parallel by the delivery engine; the
+        session is only touched from the calling thread.
+        Args:
+            deadline: UTC datetime after which no new batch is claimed; the
+                rest is left for the next run
+        Returns: dict with 'sent', 'failed', 'batches' and 'messages_per_second'
+        """
+        if self.digest_mode:
+            return self.send_digest_notifications()
+
+        totals = {'sent': 0, 'failed': 0, 'batches': 0, 'elapsed': 0.0}
+        while True:
+            if (deadline is not None and totals['batches']
+                    and datetime.utcnow() >= deadline):
+                break
+            token, claimed = self.claim_batch()
+            if not claimed:
+                break
+            notifications = self.session.query(Notification).options(
+                joinedload(Notification.student),
+                joinedload(Notification.teacher)
+            ).filter(
+                Notification.claim_token == token
+            ).all()
+
+            # Build every message before sending, so a bad row cannot stop
+            # the batch halfway with its sent rows still claimed
+            messages, unbuildable, build_error = [], [], None
+            for notification in notifications:
+                try:
+                    messages.append(
+                        (notification.id, self._build_email_message(notification)))
+                except Exception as e:
+                    unbuildable.append(notification.id)
+                    build_error = build_error or str(e)
+            if unbuildable:
+                self._complete_claim(
+                    token, None, Notification.id.in_(unbuildable),
+                    f"Could not build message: {build_error}"[:500]
+                )
+                totals['failed'] += len(unbuildable)
+
+            result = self.delivery_engine.send_many(messages)
+            self._complete_claim(
+                token,
+                Notification.id.in_(result['sent']) if result['sent'] else None,
+                Notification.id.in_(result['failed']) if result['failed'] else None,
+                "SMTP delivery failed"
+            )
+            totals['sent'] += len(result['sent'])
+            totals['failed'] += len(result['failed'])
+            totals['batches'] += 1
+            totals['elapsed'] += result['elapsed']
+
+        totals['messages_per_second'] = (
+            totals['sent'] / totals['elapsed'] if totals['elapsed'] else 0.0)
+        return totals
+
+    def send_digest_notifications(self):
+        """Send one digest email per teacher covering all their claimed notifications.
 
-    def _create_overdue_message(self, transaction):
-        days_overdue = (datetime.now().date() - transaction.due_date).days
+        The included notifications are marked sent with a single bulk update.
+        Returns: dict with 'teachers', 'notifications_sent', 'failed' teacher
+        ids and 'messages_per_second'
+        """
+        today = datetime.now().date()
+        # Claim everything pending at once so each teacher gets one digest
+        token, claimed = self.claim_batch(limit=self.batch_size * 100)
+        if not claimed:
+            return {'teachers': 0, 'notifications_sent': 0, 'failed': [],
+                    'messages_per_second': 0.0}
+
+        rows = self.session.query(
+            Notification.id,
+            Notification.teacher_id,
+            TeacherContact.name.label('teacher_name'),
+            TeacherContact.email.label('teacher_email'),
+            Student.first_name,
+            Student.last_name,
+            Student.class_name,
+            Student.division,
+            Student.roll_number,
+            Book.title,
+            BookTransaction.due_date
+        ).join(
+            TeacherContact, TeacherContact.id == Notification.teacher_id
+        ).join(
+            Student, Student.id == Notification.student_id
+        ).join(
+            Book, Book.id == Notification.book_id
+        ).outerjoin(
+            BookTransaction, BookTransaction.id == Notification.transaction_id
+        ).filter(
+            Notification.claim_token == token
+        ).order_by(
+            Notification.teacher_id,
+            Student.class_name,
+            Student.division,
+            Student.roll_number
+        ).all()
+
+        # Group claimed notifications by teacher
+        digests = {}
+        for row in rows:
+            digests.setdefault(row.teacher_id, []).append(row)
+
+        # Digests that cannot be built are left out and retried like failures
+        messages = []
+        for teacher_id, teacher_rows in digests.items():
+            try:
+                messages.append(
+                    (teacher_id, self._build_digest_message(teacher_rows, today)))
+            except Exception as e:
+                logger.error(f"Failed to build digest for teacher {teacher_id}: {e}")
+        result = self.delivery_engine.send_many(messages)
+        notifications_sent = self._complete_claim(
+            token,
+            Notification.teacher_id.in_(result['sent']) if result['sent'] else None,
+            # Claimed rows not in a sent digest (failed, or missing a teacher)
+            or_(Notification.teacher_id.is_(None),
+                Notification.teacher_id.notin_(result['sent'])) if result['sent'] else true(),
+            "SMTP delivery failed"
+        )
+
+        return {
+            'teachers': len(digests),
+            'notifications_sent': notifications_sent,
+            'failed': result['failed'],
+            'messages_per_second': result['messages_per_second']
+        }
+
+    def get_dashboard_rows(self, class_name, division='All'):
+        """Notifications of a class for the dashboard, with days overdue from the loan.
+        Returns: list of (id, name, class, roll no, title, days overdue, status)
+        """
+        today = datetime.now().date()
+        query = self.session.query(
+            Notification.id,
+            Notification.status,
+            Student.first_name,
+            Student.last_name,
+            Student.class_name,
+            Student.division,
+            Student.roll_number,
+            Book.title,
+            BookTransaction.due_date
+        ).join(
+            Student, Student.id == Notification.student_id
+        ).join(
+            Book, Book.id == Notification.book_id
+        ).outerjoin(
+            BookTransaction, BookTransaction.id == Notification.transaction_id
+        ).filter(
+            Student.class_name == class_name
+        )
+        if division != 'All':
+            query = query.filter(Student.division == division)
+
+        return [(
+            row.id,
+            f"{row.first_name} {row.last_name}",
+            f"{row.class_name}-{row.division}",
+            str(row.roll_number),
+            row.title,
+            str((today - row.due_date).days) if row.due_date else '',
+            NOTIFICATION_STATUS_LABELS.get(row.status, "Pending")
+        ) for row in query.order_by(Student.division, Student.roll_number, Notification.id)]
+
+    def send_notification(self, notification_id):
+        """Send one notification now, unless another sender has it. Returns: True if sent"""
+        token, claimed = self.claim_batch(
+            limit=1, extra_condition=Notification.id == notification_id)
+        if not claimed:
+            return False
+        notification = self.session.query(Notification).options(
+            joinedload(Notification.student),
+            joinedload(Notification.teacher)
+        ).filter(Notification.claim_token == token).one()
+        sent = self._send_email_notification(notification)
+        self._complete_claim(
+            token,
+            Notification.id == notification_id if sent else None,
+            None if sent else Notification.id == notification_id,
+            "SMTP delivery failed"
+        )
+        return sent
+
+    def _build_digest_message(self, rows, today):
+        first = rows[0]
+        classes = sorted({f"{row.class_name}-{row.division}" for row in rows})
+
+        msg = MIMEMultipart('alternative')
+        msg['From'] = self.from_email
+        msg['To'] = first.teacher_email
+        msg['Subject'] = f"Library Notice: {len(rows)} Overdue Book(s) - Class {', '.join(classes)}"
+
+        table = []
+        for row in rows:
+            days_overdue = (today - row.due_date).days if row.due_date else '-'
+            table.append((
+                str(row.roll_number),
+                f"{row.first_name} {row.last_name or ''}".strip(),
+                f"{row.class_name}-{row.division}",
+                row.title,
+                str(days_overdue)
+            ))
+        headers = ("Roll No", "Student", "Class", "Book", "Days Overdue")
+        widths = [max(len(value) for value in column)
+                  for column in zip(headers, *table)]
+        lines = ["  ".join(value.ljust(width) for value, width in zip(line, widths))
+                 for line in [headers] + table]
+        table_text = "\n".join(lines)
+        header_cells = "".join(f"<th>{header}</th>" for header in headers)
+
+        body = f"""Dear {first.teacher_name},
+
+The following books issued to students in your class are overdue:
+
+{table_text}
+
+Please remind the students to return the books as soon as possible.
+
+Best regards,
+Library Management System
+"""
+        html_rows = "".join(
+            "<tr>" + "".join(f"<td>{escape(value)}</td>" for value in line) + "</tr>"
+            for line in table
+        )
+        html_body = f"""<p>Dear {escape(first.teacher_name)},</p>
+<p>The following books issued to students in your class are overdue:</p>
+<table border="1" cellpadding="4" cellspacing="0">
+<tr>{header_cells}</tr>
+{html_rows}
+</table>
+<p>Please remind the students to return the books as soon as possible.</p>
+<p>Best regards,<br>Library Management System</p>
+"""
+        msg.attach(MIMEText(body, 'plain'))
+        msg.attach(MIMEText(html_body, 'html'))
+        return msg
+
+    def _create_overdue_message(self, row, today):
+        days_overdue = (today - row.due_date).days
         return f"""
-        Student: {transaction.student.first_name} {transaction.student.last_name}
-        Class: {transaction.student.class_name}-{transaction.student.division}
-        Roll Number: {transaction.student.roll_number}
-        Book: {transaction.book.title}
-        Due Date: {transaction.due_date}
+        Student: {row.first_name} {row.last_name}
+        Class: {row.class_name}-{row.division}
+        Roll Number: {row.roll_number}
+        Book: {row.title}
+        Due Date: {row.due_date}
         Days Overdue: {days_overdue}
         """
 
-    def _send_email_notification(self, notification):
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = self.from_email
-            msg['To'] = notification.teacher.email
-            msg['Subject'] = f"Library Notice: Overdue Book - Class {notification.student.class_name}-{notification.student.division}"
+    def _build_email_message(self, notification):
+        msg = MIMEMultipart()
+        msg['From'] = self.from_email
+        msg['To'] = notification.teacher.email
+        msg['Subject'] = f"Library Notice: Overdue Book - Class {notification.student.class_name}-{notification.student.division}"
 
-            body = f"""
-            Dear {notification.teacher.name},
+        body = f"""
+        Dear {notification.teacher.name},
 
-            This is to inform you about an overdue book in your class:
+        This is to inform you about an overdue book in your class:
 
-            {notification.message}
+        {notification.message}
 
-            Please remind the student to return the book as soon as possible.
+        Please remind the student to return the book as soon as possible.
 
-            Best regards,
-            Library Management System
-            """
-
-            msg.attach(MIMEText(body, 'plain'))
+        Best regards,
+        Library Management System
+        """
 
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+        msg.attach(MIMEText(body, 'plain'))
+        return msg
 
-            return True
+    def _send_email_notification(self, notification):
+        try:
+            msg = self._build_email_message(notification)
         except Exception as e:
-            print(f"Failed to send email: {str(e)}")
+            logger.error(f"Failed to build email for notification {notification.id}: {e}")
             return False
+        return self.delivery_engine.send(msg)
+# frontend/widgets/service_task.py
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+class ServiceTaskSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+class ServiceTask(QRunnable):
+    """Runs a service call on a QThreadPool and reports back through signals"""
+
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.signals = ServiceTaskSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
 # frontend/screens/notification_dashboard.py
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
                            QPushButton, QTableWidget, QTableWidgetItem,
-                           QLabel, QComboBox)
-from PyQt6.QtCore import Qt, QTimer
+                           QLabel, QComboBox, QStyledItemDelegate,
+                           QStyleOptionButton, QStyle, QApplication)
+from PyQt6.QtCore import Qt, QTimer, QThreadPool, QEvent, pyqtSignal
+from frontend.widgets.service_task import ServiceTask
+
+ACTION_COLUMN = 6
+
+class SendButtonDelegate(QStyledItemDelegate):
+    """Paints a Send button in cells that carry a notification id"""
+    send_requested = pyqtSignal(int)
+
+    def paint(self, painter, option, index):
+        notification_id = index.data(Qt.ItemDataRole.UserRole)
+        if notification_id is None:
+            super().paint(painter, option, index)
+            return
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(4, 2, -4, -2)
+        button.text = "Send"
+        button.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+        QApplication.style().drawControl(
+            QStyle.ControlElement.CE_PushButton, button, painter)
+
+    def editorEvent(self, event, model, option, index):
+        notification_id = index.data(Qt.ItemDataRole.UserRole)
+        if (notification_id is not None
+                and event.type() == QEvent.Type.MouseButtonRelease):
+            self.send_requested.emit(notification_id)
+            return True
+        return False
 
 class NotificationDashboard(QWidget):
-    def __init__(self, notification_service):
+    def __init__(self, notification_service, scheduler):
         super().__init__()
         self.notification_service = notification_service
+        # Manual sends run through the scheduler's locked, recorded job path
+        self.scheduler = scheduler
+        # One background thread, so service calls never overlap each other
+        # and never block the GUI thread
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self._tasks = set()
+        self._refresh_running = False
+        # Refresh requested while one was running: None, or whether it should
+        # also check for overdue books
+        self._pending_refresh = None
+        # notification id -> displayed row values
+        self._rows = {}
         self.init_ui()
         
         # Set up auto-refresh timer
@@ -579,6 +4094,8 @@ class NotificationDashboard(QWidget):
         self.class_combo.addItems([str(i) for i in range(1, 13)])
         self.division_combo = QComboBox()
         self.division_combo.addItems(['All', 'A', 'B', 'C', 'D'])
+        self.class_combo.currentTextChanged.connect(self.load_notifications)
+        self.division_combo.currentTextChanged.connect(self.load_notifications)
         
         filter_layout.addWidget(QLabel("Class:"))
         filter_layout.addWidget(self.class_combo)
@@ -593,17 +4110,22 @@ class NotificationDashboard(QWidget):
             "Student Name", "Class", "Roll No", 
             "Book Title", "Days Overdue", "Status", "Action"
         ])
+        self.send_delegate = SendButtonDelegate(self.table)
+        self.send_delegate.send_requested.connect(self.send_single_notification)
+        self.table.setItemDelegateForColumn(ACTION_COLUMN, self.send_delegate)
         
         # Buttons
         button_layout = QHBoxLayout()
         refresh_btn = QPushButton("Refresh")
         send_all_btn = QPushButton("Send All Notifications")
+        self.status_label = QLabel()
         
         refresh_btn.clicked.connect(self.refresh_notifications)
         send_all_btn.clicked.connect(self.send_all_notifications)
         
         button_layout.addWidget(refresh_btn)
         button_layout.addWidget(send_all_btn)
+        button_layout.addWidget(self.status_label)
         
         # Add widgets to layout
         layout.addWidget(header)
@@ -611,107 +4133,720 @@ class NotificationDashboard(QWidget):
         layout.addWidget(self.table)
         layout.addLayout(button_layout)
 
+    def run_in_background(self, fn, *args, on_finished=None, on_failed=None):
+        task = ServiceTask(fn, *args)
+        self._tasks.add(task)
+
+        def finished(result):
+            self._tasks.discard(task)
+            if on_finished:
+                on_finished(result)
+
+        def failed(error):
+            self._tasks.discard(task)
+            self.status_label.setText(f"Error: {error}")
+            if on_failed:
+                on_failed(error)
+
+        task.signals.finished.connect(finished)
+        task.signals.failed.connect(failed)
+        self.thread_pool.start(task)
+
     def refresh_notifications(self):
-        self.notification_service.check_overdue_books()
-        self.load_notifications()
+        self._start_refresh(check_overdue=True)
 
     def load_notifications(self):
-        # Clear existing table
-        self.table.setRowCount(0)
-        
-        # Get notifications based on filter
-        class_name = self.class_combo.currentText()
-        division = self.division_combo.currentText()
-        
-        # Load notifications from service
-        notifications = self.get_filtered_notifications(class_name, division)
-        
-        for row, notif in enumerate(notifications):
-            self.table.insertRow(row)
-            self.table.setItem(row, 0, QTableWidgetItem(
-                f"{notif.student.first_name} {notif.student.last_name}"))
-            self.table.setItem(row, 1, QTableWidgetItem(
-                f"{notif.student.class_name}-{notif.student.division}"))
-            self.table.setItem(row, 2, QTableWidgetItem(
-                str(notif.student.roll_number)))
-            self.table.setItem(row, 3, QTableWidgetItem(
-                notif.book.title))
-            self.table.setItem(row, 4, QTableWidgetItem(
-                str(self.calculate_days_overdue(notif))))
-            
-            status = "Sent" if notif.is_sent else "Pending"
-            self.table.setItem(row, 5, QTableWidgetItem(status))
-            
-            # Add send button if notification is pending
-            if not notif.is_sent:
-                send_btn = QPushButton("Send")
-                send_btn.clicked.connect(
-                    lambda checked, n=notif: self.send_single_notification(n))
-                self.table.setCellWidget(row, 6, send_btn)
+        self._start_refresh(check_overdue=False)
+
+    def _start_refresh(self, check_overdue):
+        if self._refresh_running:
+            # Run again with the filter current at that time once this one ends
+            self._pending_refresh = bool(self._pending_refresh) or check_overdue
+            return
+        self._refresh_running = True
+        self.status_label.setText("Refreshing...")
+        self.run_in_background(
+            self._fetch_rows,
+            check_overdue,
+            self.class_combo.currentText(),
+            self.division_combo.currentText(),
+            on_finished=self.apply_rows,
+            on_failed=self.refresh_failed
+        )
+
+    def _start_pending_refresh(self):
+        """Start the refresh queued while another was running.
+        Returns: True if one was started
+        """
+        if self._pending_refresh is None:
+            return False
+        check_overdue = self._pending_refresh
+        self._pending_refresh = None
+        self._start_refresh(check_overdue)
+        return True
+
+    def _fetch_rows(self, check_overdue, class_name, division):
+        # Runs on the background thread
+        if check_overdue:
+            self.notification_service.check_overdue_books()
+        return self.notification_service.get_dashboard_rows(class_name, division)
+
+    def refresh_failed(self, error):
+        # Only a failed refresh ends the running one; send failures don't
+        self._refresh_running = False
+        self._start_pending_refresh()
+
+    def apply_rows(self, rows):
+        """Update only the table rows that changed since the last refresh"""
+        self._refresh_running = False
+        # Rows for an outdated filter are dropped in favour of the queued refresh
+        if self._start_pending_refresh():
+            return
+        self.status_label.setText("")
+        new_rows = {row[0]: row[1:] for row in rows}
 
-    def send_single_notification(self, notification):
-        if self.notification_service._send_email_notification(notification):
-            self.refresh_notifications()
+        # Remove rows that are gone, bottom up so row numbers stay valid
+        for row_number in reversed(range(self.table.rowCount())):
+            notification_id = self.table.item(row_number, 0).data(Qt.ItemDataRole.UserRole)
+            if notification_id not in new_rows:
+                self.table.removeRow(row_number)
+                del self._rows[notification_id]
+
+        # Update changed rows in place
+        for row_number in range(self.table.rowCount()):
+            notification_id = self.table.item(row_number, 0).data(Qt.ItemDataRole.UserRole)
+            values = new_rows[notification_id]
+            if values != self._rows[notification_id]:
+                self._set_row(row_number, notification_id, values)
+
+        # Append new rows
+        for notification_id, values in new_rows.items():
+            if notification_id not in self._rows:
+                row_number = self.table.rowCount()
+                self.table.insertRow(row_number)
+                self._set_row(row_number, notification_id, values)
+
+    def _set_row(self, row_number, notification_id, values):
+        self._rows[notification_id] = values
+        for column, value in enumerate(values):
+            item = QTableWidgetItem(str(value))
+            if column == 0:
+                item.setData(Qt.ItemDataRole.UserRole, notification_id)
+            self.table.setItem(row_number, column, item)
+
+        # Action cell is drawn as a Send button by the delegate while pending
+        is_pending = values[-1] == "Pending"
+        action = QTableWidgetItem()
+        action.setData(Qt.ItemDataRole.UserRole, notification_id if is_pending else None)
+        self.table.setItem(row_number, ACTION_COLUMN, action)
+
+    def send_single_notification(self, notification_id):
+        self.run_in_background(
+            self.notification_service.send_notification,
+            notification_id,
+            on_finished=lambda sent: self.load_notifications()
+        )
 
     def send_all_notifications(self):
-        self.notification_service.send_pending_notifications()
-        self.refresh_notifications()
+        self.run_in_background(
+            self.scheduler.run_now,
+            'send_notifications',
+            on_finished=self._send_all_finished
+        )
+
+    def _send_all_finished(self, result):
+        if result is None:
+            self.status_label.setText("Notifications are already being sent")
+            return
+        self.load_notifications()
+# backend/instrumentation.py
+import contextvars
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Warn when one operation runs the same statement shape more than this often
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', '20'))
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+def escape_label_value(value):
+    """Escape a label value for the Prometheus text format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class MetricsRegistry:
+    """Thread-safe histograms and counters, keyed by name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
 
     @staticmethod
-    def calculate_days_overdue(notification):
-        return (datetime.now().date() - notification.student.transactions[-1].due_date).days
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            key = self._key(name, labels)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        with self._lock:
+            key = self._key(name, labels)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def operations(self):
+        """Per-operation summary for the diagnostics panel.
+        Returns: list of dicts sorted by total time, slowest first
+        """
+        with self._lock:
+            summary = {}
+            for (name, labels), histogram in self._histograms.items():
+                if name != 'operation_duration_seconds':
+                    continue
+                operation = dict(labels)['operation']
+                summary[operation] = {
+                    'operation': operation,
+                    'calls': histogram.count,
+                    'total_seconds': histogram.sum,
+                    'max_seconds': histogram.max,
+                    'queries': 0,
+                    'db_seconds': 0.0,
+                }
+            for (name, labels), value in self._counters.items():
+                operation = dict(labels).get('operation')
+                if operation in summary and name == 'operation_queries_total':
+                    summary[operation]['queries'] = value
+                elif operation in summary and name == 'operation_db_seconds_total':
+                    summary[operation]['db_seconds'] = value
+        return sorted(summary.values(), key=lambda op: op['total_seconds'], reverse=True)
+
+    def render_prometheus(self):
+        """Returns: all metrics in the Prometheus text exposition format"""
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{key}="{escape_label_value(value)}"'
+                                  for key, value in pairs) + '}'
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE library_{name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"library_{name}{label_text(labels)} {value}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE library_{name} histogram")
+                for (metric, labels), histogram in sorted(self._histograms.items(),
+                                                          key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                        cumulative += count
+                        lines.append(f"library_{name}_bucket"
+                                     f"{label_text(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"library_{name}_bucket"
+                                 f"{label_text(labels, [('le', '+Inf')])} {histogram.count}")
+                    lines.append(f"library_{name}_sum{label_text(labels)} {histogram.sum}")
+                    lines.append(f"library_{name}_count{label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Write metrics for the node_exporter textfile collector"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, path)
+
+metrics = MetricsRegistry()
+
+class OperationStats:
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Counter()
+
+_current_operation = contextvars.ContextVar('current_operation', default=None)
+
+@contextmanager
+def track_operation(name):
+    """Time an operation and account the SQL it runs"""
+    stats = OperationStats(name, parent=_current_operation.get())
+    token = _current_operation.set(stats)
+    started = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        elapsed = time.perf_counter() - started
+        _current_operation.reset(token)
+        metrics.observe('operation_duration_seconds', elapsed, operation=name)
+        metrics.increment('operation_queries_total', stats.queries, operation=name)
+        metrics.increment('operation_db_seconds_total', stats.db_seconds, operation=name)
+        for statement, count in stats.statements.items():
+            if count > N_PLUS_ONE_THRESHOLD:
+                metrics.increment('n_plus_one_warnings_total', operation=name)
+                logger.warning("Possible N+1 in %s: statement ran %d times: %s",
+                               name, count, statement[:200])
+
+def instrument_methods(cls):
+    """Class decorator: track every public method as '<Class>.<method>'"""
+    for attribute, value in list(vars(cls).items()):
+        if attribute.startswith('_') or not callable(value) or isinstance(value, type):
+            continue
+        if isinstance(value, (staticmethod, classmethod)):
+            continue
+        setattr(cls, attribute, _tracked(f"{cls.__name__}.{attribute}", value))
+    return cls
+
+def _tracked(name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with track_operation(name):
+            return method(*args, **kwargs)
+    return wrapper
+
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,?)+\)')
+_WHITESPACE = re.compile(r'\s+')
+
+def statement_shape(statement):
+    """Statement text with expanded IN lists collapsed, so repeats compare equal"""
+    return _WHITESPACE.sub(' ', _PLACEHOLDER_LIST.sub('(?)', statement)).strip()
+
+def install_sql_instrumentation(engine):
+    """Count queries and database time per operation through engine events"""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        metrics.observe('db_query_seconds', elapsed)
+        stats = _current_operation.get()
+        shape = statement_shape(statement) if stats is not None else None
+        while stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+            stats.statements[shape] += 1
+            stats = stats.parent
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(context):
+        # after_cursor_execute is not called for a failed statement
+        if context.connection is not None and context.cursor is not None:
+            started = context.connection.info.get('query_started')
+            if started:
+                started.pop()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_exporter(port=None, textfile=None, interval=60):
+    """Serve /metrics on localhost:port and/or rewrite textfile every interval seconds"""
+    if port:
+        server = ThreadingHTTPServer(('127.0.0.1', int(port)), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-http',
+                         daemon=True).start()
+    if textfile:
+        def write_periodically():
+            while True:
+                try:
+                    metrics.write_textfile(textfile)
+                except OSError as e:
+                    logger.error("Failed to write metrics file: %s", e)
+                time.sleep(interval)
+        threading.Thread(target=write_periodically, name='metrics-textfile',
+                         daemon=True).start()
+# backend/database.py
+import os
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from .instrumentation import install_sql_instrumentation
+from .models.base import Base
+# Imported so every table is registered on Base.metadata
+from .models import book, student, notification, fine, rollup, archive, job
+
+DEFAULT_DATABASE_URL = 'sqlite:///library.db'
+
+# WAL lets the issue desk keep reading while a scheduled job writes
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,          # 20 MB page cache
+    'mmap_size': 268435456,        # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+def create_db_engine(url=None):
+    """Create an engine with a bounded connection pool and, on SQLite, tuned pragmas"""
+    url = url or os.getenv('DATABASE_URL', DEFAULT_DATABASE_URL)
+    pool_size = int(os.getenv('DB_POOL_SIZE', '5'))
+    max_overflow = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+
+    if url.startswith('sqlite'):
+        engine = create_engine(
+            url,
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            connect_args={'check_same_thread': False, 'timeout': 5},
+        )
+
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+    else:
+        engine = create_engine(
+            url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_pre_ping=True,
+        )
+    install_sql_instrumentation(engine)
+    return engine
+
+_engine = None
+
+# One session per thread; jobs and background workers should prefer
+# session_scope() so each unit of work gets its own short-lived session
+SessionFactory = sessionmaker(expire_on_commit=False)
+Session = scoped_session(SessionFactory)
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_db_engine()
+        SessionFactory.configure(bind=_engine)
+    return _engine
+
+def init_db():
+    """Create any missing tables"""
+    Base.metadata.create_all(get_engine())
+
+def create_session():
+    """The calling thread's session"""
+    get_engine()
+    return Session()
+
+@contextmanager
+def session_scope():
+    """Unit of work: commit on success, roll back on error, always close"""
+    get_engine()
+    session = SessionFactory()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
 # backend/scheduler.py
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import func, or_, update
+from sqlalchemy.exc import IntegrityError
+from .database import session_scope
+from .instrumentation import metrics
+from .models.job import JobHistory, JobLock
+from .services.archive_service import ArchiveService
+from .services.circulation_service import CirculationService
+from .services.fine_service import FineEngine
+from .services.rollup_service import RollupService
+from .services.notification_service import NotificationService
 
 class NotificationScheduler:
-    def __init__(self, notification_service):
-        self.notification_service = notification_service
+    """Run the library's background jobs.
+
+    Every run, scheduled or not, goes through run_job(): it takes a lease in
+    job_locks so only one process runs a job at a time, and records the run
+    in job_history. On start, jobs that missed one or more runs while the
+    application was down are run once to catch up.
+    """
+
+    def __init__(self, session_factory=session_scope, owner=None):
+        self.session_factory = session_factory
         self.scheduler = BackgroundScheduler()
+        # Shared by every run so pooled SMTP connections are reused
+        self.delivery_engine = None
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = int(os.getenv('JOB_LEASE_SECONDS', '3600'))
+        self.misfire_grace_time = int(os.getenv('JOB_MISFIRE_GRACE_SECONDS', '3600'))
+
+        # job id -> (function, trigger, rows processed by a result)
+        self.jobs = {
+            # Repair loan counters and book statuses that drifted from the
+            # loans table, before the night's fine and overdue runs
+            'reconcile_counters': (
+                self.reconcile_counters, CronTrigger(hour=0, minute=30),
+                lambda result: result['students'] + result['books']),
+            # Accrue fines overnight, before the morning overdue check
+            'accrue_fines': (
+                self.accrue_fines, CronTrigger(hour=1),
+                lambda result: result['updated']),
+            # Check for overdue books every morning at 8 AM
+            'check_overdue_books': (
+                self.check_overdue_books, CronTrigger(hour=8),
+                lambda result: result['created']),
+            # Send pending notifications every hour
+            'send_notifications': (
+                self.send_pending_notifications, CronTrigger(minute=0),
+                lambda result: result.get('sent', result.get('notifications_sent'))),
+            # Record the day's closing overdue counts for the trend reports
+            'snapshot_overdues': (
+                self.snapshot_overdues, CronTrigger(hour=23, minute=55),
+                lambda result: result),
+            # Move old loans and notifications to the archive every Sunday night
+            'archive_history': (
+                self.archive_history, CronTrigger(day_of_week='sun', hour=2),
+                lambda result: result['notifications'] + result['transactions']),
+        }
+
+    def run_in_session(self, job):
+        """Run job(notification_service) in its own session and transaction"""
+        with self.session_factory() as session:
+            service = NotificationService(session, delivery_engine=self.delivery_engine)
+            result = job(service)
+            self.delivery_engine = service.delivery_engine
+        return result
+
+    def check_overdue_books(self, since=None):
+        return self.run_in_session(lambda service: service.check_overdue_books())
+
+    def send_pending_notifications(self, since=None):
+        def send(service):
+            # Stop claiming while a claimed batch can still finish, or its
+            # claim expire, inside this run's job lease
+            deadline = (datetime.utcnow()
+                        + timedelta(seconds=self.lease_seconds - service.lease_seconds))
+            return service.send_pending_notifications(deadline=deadline)
+        return self.run_in_session(send)
+
+    def accrue_fines(self, since=None):
+        # Fines are recomputed from due dates, so one run covers missed days
+        with self.session_factory() as session:
+            return FineEngine(session).accrue()
+
+    def snapshot_overdues(self, since=None):
+        with self.session_factory() as session:
+            if since is not None:
+                return RollupService(session).backfill_overdues(since)
+            return RollupService(session).snapshot_overdues()
+
+    def archive_history(self, since=None):
+        with self.session_factory() as session:
+            return ArchiveService(session).archive()
+
+    def reconcile_counters(self, since=None):
+        # Counters are recomputed from the loans table, so one run covers missed days
+        with self.session_factory() as session:
+            return CirculationService(session).reconcile_counters()
+
+    def acquire_lock(self, job_id):
+        """Take the job's lease unless another live owner holds it.
+        Returns: True if this process may run the job
+        """
+        now = datetime.utcnow()
+        values = {
+            'owner': self.owner,
+            'locked_until': now + timedelta(seconds=self.lease_seconds),
+            'acquired_at': now
+        }
+        try:
+            with self.session_factory() as session:
+                acquired = session.execute(
+                    update(JobLock).where(
+                        JobLock.job_id == job_id,
+                        or_(JobLock.locked_until.is_(None),
+                            JobLock.locked_until < now)
+                    ).values(**values).execution_options(synchronize_session=False)
+                ).rowcount
+                if not acquired and session.query(JobLock).get(job_id) is None:
+                    session.add(JobLock(job_id=job_id, **values))
+                    session.flush()
+                    acquired = 1
+        except IntegrityError:
+            # Another process inserted the lock row first
+            return False
+        return bool(acquired)
+
+    def release_lock(self, job_id):
+        with self.session_factory() as session:
+            session.execute(
+                update(JobLock).where(
+                    JobLock.job_id == job_id,
+                    JobLock.owner == self.owner
+                ).values(locked_until=None).execution_options(synchronize_session=False)
+            )
+
+    def record_run(self, job_id, trigger, status, started_at, duration,
+                   rows=None, error=None):
+        with self.session_factory() as session:
+            session.add(JobHistory(
+                job_id=job_id, trigger=trigger, status=status,
+                started_at=started_at, duration_seconds=duration,
+                rows=rows, error=error[:500] if error else None
+            ))
+        metrics.observe('job_seconds', duration, job=job_id)
+        metrics.increment('job_runs_total', job=job_id, status=status)
+
+    def run_job(self, job_id, trigger='scheduled', since=None):
+        """Run a registered job under its lock and record the run.
+        Returns: the job's result, or None if another process is running it
+        """
+        function, _, count_rows = self.jobs[job_id]
+        started_at = datetime.utcnow()
+        if not self.acquire_lock(job_id):
+            self.record_run(job_id, trigger, 'LOCKED', started_at, 0.0)
+            return None
+
+        start = time.perf_counter()
+        try:
+            result = function(since=since)
+        except Exception as e:
+            self.record_run(job_id, trigger, 'FAILED', started_at,
+                            time.perf_counter() - start, error=str(e))
+            raise
+        finally:
+            self.release_lock(job_id)
+        self.record_run(job_id, trigger, 'SUCCESS', started_at,
+                        time.perf_counter() - start, rows=count_rows(result))
+        return result
+
+    def run_now(self, job_id):
+        """Run a job immediately, through the same path as scheduled runs"""
+        return self.run_job(job_id, trigger='manual')
+
+    def missed_jobs(self, now=None):
+        """Jobs whose trigger fired since their last successful run.
+        Returns: dict of job id -> date of the last successful run
+        """
+        now = now or datetime.now(timezone.utc)
+        with self.session_factory() as session:
+            last_runs = dict(session.query(
+                JobHistory.job_id, func.max(JobHistory.started_at)
+            ).filter(JobHistory.status == 'SUCCESS').group_by(
+                JobHistory.job_id
+            ).all())
+
+        missed = {}
+        for job_id, (_, trigger, _) in self.jobs.items():
+            last_run = last_runs.get(job_id)
+            if last_run is None:
+                continue
+            last_run = last_run.replace(tzinfo=timezone.utc)
+            next_fire = trigger.get_next_fire_time(None, last_run + timedelta(seconds=1))
+            if next_fire is not None and next_fire <= now:
+                missed[job_id] = last_run.date()
+        return missed
 
     def start(self):
-        # Check for overdue books every morning at 8 AM
-        self.scheduler.add_job(
-            self.notification_service.check_overdue_books,
-            trigger=CronTrigger(hour=8),
-            id='check_overdue_books'
-        )
+        for job_id, (_, trigger, _) in self.jobs.items():
+            self.scheduler.add_job(
+                self.run_job,
+                trigger=trigger,
+                args=(job_id,),
+                id=job_id,
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=self.misfire_grace_time
+            )
 
-        # Send pending notifications every hour
-        self.scheduler.add_job(
-            self.notification_service.send_pending_notifications,
-            trigger=CronTrigger(minute=0),  # Every hour
-            id='send_notifications'
-        )
+        # Missed runs are made up once, not once per missed fire time
+        for job_id, since in self.missed_jobs().items():
+            self.scheduler.add_job(
+                self.run_job,
+                args=(job_id, 'catch-up', since),
+                id=f'{job_id}_catch_up',
+                max_instances=1
+            )
 
         self.scheduler.start()
 
     def stop(self):
         self.scheduler.shutdown()
+        if self.delivery_engine is not None:
+            self.delivery_engine.close()
 # main.py
-import os
-from dotenv import load_dotenv
-from backend.scheduler import NotificationScheduler
-import backend.#!/usr/bin/env 
+#!/usr/bin/env python
 """
 Main entry point for the Library Management System.
 Initializes core services and schedulers.
 """
 
 # Standard library imports
+import argparse
 import os
+import re
+import signal
+import subprocess
 import sys
 import logging
-from typing import Optional
-
-# Third-party imports
-from dotenv import load_dotenv
-from sqlalchemy.orm import Session
+import threading
+from typing import Optional, TYPE_CHECKING
 
-# Local application imports
-from backend.scheduler import NotificationScheduler
-from backend.services.notification_service import NotificationService
-from backend.database import create_session  # Assuming you have this
+# Third-party and local application modules are imported inside the
+# functions that need them, so the process starts quickly
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
 
 def setup_logging() -> None:
     """Configure logging for the application."""
@@ -730,6 +4865,8 @@ def load_environment() -> bool:
     Returns: bool indicating success
     """
     try:
+        from dotenv import load_dotenv
+
         load_dotenv()
         required_vars = [
             'SMTP_SERVER',
@@ -750,28 +4887,136 @@ def load_environment() -> bool:
         logging.error(f"Failed to load environment variables: {e}")
         return False
 
-def initialize_services(db_session: Session) -> Optional[tuple]:
+def initialize_services(db_session: "Session") -> Optional[tuple]:
     """
     Initialize core services required for the application.
     Returns: Tuple of (NotificationService, NotificationScheduler) or None if initialization fails
     """
     try:
+        from backend.database import init_db, session_scope
+        from backend.scheduler import NotificationScheduler
+        from backend.services.lookup_index import barcode_index
+        from backend.services.notification_service import NotificationService
+        from backend.services.search_service import CatalogSearch
+        from backend.services.student_resolver import student_name_changes
+
+        # Create missing tables
+        init_db()
+        
         # Initialize notification service
         notification_service = NotificationService(db_session)
         
-        # Initialize and start scheduler
-        scheduler = NotificationScheduler(notification_service)
+        with session_scope() as session:
+            # Make sure the catalog search index exists
+            CatalogSearch(session).install()
+            
+            # Load the issue desk barcode index and keep it current
+            barcode_index.load(session)
+        barcode_index.watch()
+        student_name_changes.watch()
+        
+        # Initialize scheduler; every job runs in its own session
+        scheduler = NotificationScheduler(session_scope)
         
         return notification_service, scheduler
     except Exception as e:
         logging.error(f"Failed to initialize services: {e}")
         return None
 
-def main() -> int:
+def profile_startup(top: int = 25) -> int:
+    """
+    Print an import-time breakdown of the modules loaded at startup.
+    Returns: Exit code
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.abspath(__file__), '--imports-only'],
+        capture_output=True,
+        text=True
+    )
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    timings = []
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)', line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            timings.append((int(cumulative_us), int(self_us), len(indent), module))
+
+    # Top-level imports (least indented) add up to the total
+    if not timings:
+        print(result.stderr or "No import timings collected")
+        return 1
+    top_level = min(indent for _, _, indent, _ in timings)
+    total_us = sum(cumulative for cumulative, _, indent, _ in timings if indent == top_level)
+    print(f"Total import time: {total_us / 1000:.1f} ms")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, _, module in sorted(timings, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {module}")
+    return result.returncode
+
+def import_startup_modules() -> None:
+    """Import what initialize_services() needs, for --profile-startup."""
+    from dotenv import load_dotenv
+    from backend.database import init_db, session_scope
+    from backend.scheduler import NotificationScheduler
+    from backend.services.lookup_index import barcode_index
+    from backend.services.notification_service import NotificationService
+    from backend.services.search_service import CatalogSearch
+    from backend.services.student_resolver import student_name_changes
+
+def rebuild_rollups() -> int:
+    """
+    Recompute the circulation rollup tables from the transaction history.
+    Returns: Exit code
+    """
+    from dotenv import load_dotenv
+    from backend.database import init_db, session_scope
+    from backend.services.rollup_service import RollupService
+
+    load_dotenv()
+    init_db()
+    with session_scope() as session:
+        result = RollupService(session).rebuild()
+    print(f"Rebuilt {result['class_rows']} class rows and "
+          f"{result['title_rows']} title rows")
+    return 0
+
+def wait_for_shutdown() -> None:
+    """Block until SIGINT or SIGTERM is received."""
+    shutdown_event = threading.Event()
+
+    def request_shutdown(signum, frame):
+        shutdown_event.set()
+
+    signal.signal(signal.SIGINT, request_shutdown)
+    signal.signal(signal.SIGTERM, request_shutdown)
+    # Ctrl+C cannot interrupt a lock wait on Windows, so wake up regularly
+    # there; elsewhere the signal handler ends the wait directly
+    timeout = 1.0 if sys.platform == 'win32' else None
+    while not shutdown_event.wait(timeout):
+        pass
+
+def main(argv: Optional[list] = None) -> int:
     """
     Main function to start the application.
     Returns: Exit code (0 for success, 1 for failure)
     """
+    parser = argparse.ArgumentParser(description="Library Management System")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print an import-time breakdown and exit")
+    parser.add_argument('--rebuild-rollups', action='store_true',
+                        help="rebuild the circulation rollup tables and exit")
+    parser.add_argument('--imports-only', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.imports_only:
+        import_startup_modules()
+        return 0
+    if args.profile_startup:
+        return profile_startup()
+    if args.rebuild_rollups:
+        return rebuild_rollups()
+
     # Setup logging first
     setup_logging()
     logging.info("Starting Library Management System")
@@ -782,6 +5027,8 @@ def main() -> int:
         return 1
 
     try:
+        from backend.database import create_session
+
         # Create database session
         db_session = create_session()
         
@@ -797,30 +5044,24 @@ def main() -> int:
         scheduler.start()
         logging.info("Notification scheduler started successfully")
 
-        # Keep the main thread alive
-        try:
-            while True:
-                import time
-                time.sleep(1)
-        except KeyboardInterrupt:
-            logging.info("Shutting down gracefully...")
-            scheduler.stop()
-            db_session.close()
+        # Export metrics if configured
+        from backend.instrumentation import start_metrics_exporter
+        start_metrics_exporter(
+            port=os.getenv('METRICS_PORT'),
+            textfile=os.getenv('METRICS_TEXTFILE')
+        )
+
+        # Block until asked to stop
+        wait_for_shutdown()
+        logging.info("Shutting down gracefully...")
+        scheduler.stop()
+        db_session.close()
             
         return 0
 
     except Exception as e:
         logging.error(f"Application failed to start: {e}")
         return 1
-# Load environment variables
-load_dotenv()
-
-# Initialize notification service and scheduler
-notification_service = NotificationService(db_session)
-scheduler = NotificationScheduler(notification_service)
-scheduler.start()
-SMTP_SERVER= smtp.gmail.com
-SMTP_PORT=587
-SMTP_USERNAME= SMTP_USERNAME
-SMTP_PASSWORD=your-app-specific-password
-FROM_EMAIL= library@mailservice.com
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""Make the modules bundled in main.py importable from the tests.
+
+main.py holds every module of the application, each starting with a
+"# backend/..." or "# frontend/..." header line. They are written out to a
+package tree in a temporary directory, which is put on sys.path.
+"""
+import os
+import re
+import sys
+import tempfile
+
+MAIN_PY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+SECTION_HEADER = re.compile(r'^# ((?:backend|frontend)/\S+\.py)$', re.M)
+
+def write_modules(source, root):
+    headers = list(SECTION_HEADER.finditer(source))
+    for header, next_header in zip(headers, headers[1:] + [None]):
+        end = next_header.start() if next_header else len(source)
+        path = os.path.join(root, *header.group(1).split('/'))
+        package = os.path.dirname(path)
+        os.makedirs(package, exist_ok=True)
+        # Every directory up to the root is a package
+        while package != root:
+            init = os.path.join(package, '__init__.py')
+            if not os.path.exists(init):
+                open(init, 'w').close()
+            package = os.path.dirname(package)
+        with open(path, 'w', encoding='utf-8') as module:
+            module.write(source[header.end():end])
+
+def pytest_configure(config):
+    with open(MAIN_PY, encoding='utf-8') as f:
+        source = f.read()
+    # The last module runs on until the entry point
+    source = source.split('\n# main.py\n', 1)[0]
+    root = tempfile.mkdtemp(prefix='library-modules-')
+    write_modules(source, root)
+    sys.path.insert(0, root)
@@ -0,0 +1,162 @@
+import smtplib
+from email.mime.text import MIMEText
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from backend.services import email_delivery
+from backend.services.email_delivery import EmailDeliveryEngine, SMTPConnectionPool
+
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP; each message pops the next scripted reply"""
+
+    replies = []
+    connections = []
+
+    def __init__(self, server, port, timeout=None):
+        self.server = server
+        self.port = port
+        self.started_tls = False
+        self.logged_in = None
+        self.sent = []
+        self.closed = False
+        FakeSMTP.connections.append(self)
+
+    def starttls(self):
+        self.started_tls = True
+
+    def login(self, username, password):
+        self.logged_in = (username, password)
+
+    def send_message(self, message):
+        reply = FakeSMTP.replies.pop(0) if FakeSMTP.replies else None
+        if reply is not None:
+            raise reply
+        self.sent.append(message['To'])
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    FakeSMTP.replies = []
+    FakeSMTP.connections = []
+    monkeypatch.setattr(smtplib, 'SMTP', FakeSMTP)
+    monkeypatch.setattr(email_delivery.time, 'sleep', lambda seconds: None)
+    return FakeSMTP
+
+
+def make_engine(size=1, max_retries=3):
+    pool = SMTPConnectionPool('smtp.example.com', 587, username='library',
+                              password='secret', size=size)
+    return EmailDeliveryEngine(pool, workers=2, max_retries=max_retries, backoff=0)
+
+
+def make_message(to='teacher@example.com'):
+    message = MIMEText('Overdue books')
+    message['To'] = to
+    return message
+
+
+def test_pool_reuses_authenticated_connection(fake_smtp):
+    engine = make_engine()
+
+    assert engine.send(make_message('a@example.com'))
+    assert engine.send(make_message('b@example.com'))
+
+    assert len(fake_smtp.connections) == 1
+    connection = fake_smtp.connections[0]
+    assert connection.started_tls
+    assert connection.logged_in == ('library', 'secret')
+    assert connection.sent == ['a@example.com', 'b@example.com']
+
+    engine.close()
+    assert connection.closed
+
+
+def test_pool_size_limits_open_connections(fake_smtp):
+    pool = SMTPConnectionPool('smtp.example.com', 587, use_tls=False, size=2)
+
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    assert len(fake_smtp.connections) == 2
+
+    pool.discard(second)
+    assert second.closed
+    assert pool.acquire() is not second
+    assert len(fake_smtp.connections) == 3
+
+
+def test_temporary_reply_is_retried(fake_smtp):
+    fake_smtp.replies = [smtplib.SMTPResponseException(421, b'Try again later')]
+    engine = make_engine()
+
+    assert engine.send(make_message())
+    # The connection survives an SMTP error reply
+    assert len(fake_smtp.connections) == 1
+    assert fake_smtp.connections[0].sent == ['teacher@example.com']
+
+
+def test_permanent_reply_is_not_retried(fake_smtp):
+    fake_smtp.replies = [smtplib.SMTPResponseException(550, b'Mailbox unavailable'), None]
+    engine = make_engine()
+
+    assert not engine.send(make_message())
+    # The second reply was never used
+    assert fake_smtp.replies == [None]
+
+
+def test_refused_recipient_is_not_retried(fake_smtp):
+    fake_smtp.replies = [
+        smtplib.SMTPRecipientsRefused({'teacher@example.com': (550, b'No such user')}),
+        None
+    ]
+    engine = make_engine()
+
+    assert not engine.send(make_message())
+    assert fake_smtp.replies == [None]
+
+
+def test_dropped_connection_is_retried_on_a_new_connection(fake_smtp):
+    fake_smtp.replies = [smtplib.SMTPServerDisconnected('Connection unexpectedly closed')]
+    engine = make_engine()
+
+    assert engine.send(make_message())
+    assert len(fake_smtp.connections) == 2
+    assert fake_smtp.connections[0].closed
+    assert fake_smtp.connections[1].sent == ['teacher@example.com']
+
+
+def test_gives_up_after_max_retries(fake_smtp):
+    fake_smtp.replies = [smtplib.SMTPResponseException(451, b'Local error')] * 3
+    engine = make_engine(max_retries=2)
+
+    assert not engine.send(make_message())
+    assert fake_smtp.replies == []
+
+
+def test_send_many_reports_sent_and_failed_keys(fake_smtp, monkeypatch):
+    engine = make_engine(size=2)
+    refused = smtplib.SMTPRecipientsRefused({'bad@example.com': (550, b'No such user')})
+
+    def send_message(connection, message):
+        if message['To'] == 'bad@example.com':
+            raise refused
+        connection.sent.append(message['To'])
+
+    monkeypatch.setattr(fake_smtp, 'send_message', send_message)
+    result = engine.send_many([
+        (1, make_message('a@example.com')),
+        (2, make_message('bad@example.com')),
+        (3, make_message('c@example.com')),
+    ])
+
+    assert sorted(result['sent']) == [1, 3]
+    assert result['failed'] == [2]
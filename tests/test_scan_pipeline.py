@@ -0,0 +1,62 @@
+import pytest
+
+from backend.services.barcode_service import BarcodeService
+from backend.services.scan_pipeline import ScanPipeline, frames_from_directory
+
+
+def run_pipeline(pipeline, frames):
+    """Decode every frame: wait for each to be taken before submitting the next"""
+    pipeline.start()
+    try:
+        for frame in frames:
+            pipeline.submit(frame)
+            pipeline.wait_until_idle()
+    finally:
+        pipeline.stop()
+
+
+def test_decodes_labels_from_directory(tmp_path):
+    pytest.importorskip('PIL')
+    pytest.importorskip('barcode')
+    # Also skipped when the zbar shared library is missing
+    pytest.importorskip('pyzbar.pyzbar', exc_type=ImportError)
+
+    labels = [
+        ('01-book.png', '9780306406157', 'ean13'),
+        ('02-student.png', 'STU00042', 'code128'),
+    ]
+    for name, code, symbology in labels:
+        (tmp_path / name).write_bytes(BarcodeService.render_barcode(code, symbology))
+    (tmp_path / 'notes.txt').write_text('not a frame')
+
+    codes = []
+    pipeline = ScanPipeline(codes.append)
+    run_pipeline(pipeline, frames_from_directory(tmp_path))
+
+    assert codes == ['9780306406157', 'STU00042']
+    stats = pipeline.stats()
+    assert stats['frames_submitted'] == 2
+    assert stats['frames_dropped'] == 0
+    assert stats['codes_decoded'] == 2
+
+
+def test_frames_from_directory_reads_images_in_name_order(tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+
+    for name, width in [('b.PNG', 20), ('a.png', 10), ('c.jpg', 30)]:
+        Image.new('L', (width, 5)).save(tmp_path / name)
+    (tmp_path / 'readme.txt').write_text('skipped')
+
+    assert [frame.width for frame in frames_from_directory(tmp_path)] == [10, 20, 30]
+
+
+def test_repeated_code_is_reported_once(monkeypatch):
+    codes = []
+    pipeline = ScanPipeline(codes.append, duplicate_window=60)
+    # Frames stand for their own decoded code
+    monkeypatch.setattr(pipeline, 'decode_frame', lambda frame: frame)
+
+    run_pipeline(pipeline, ['BK1', 'BK1', None, 'STU7', 'BK1'])
+
+    assert codes == ['BK1', 'STU7', 'BK1']
+    assert pipeline.stats()['codes_decoded'] == 3